@@ -0,0 +1,71 @@
+
+import hashlib
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+from lia_project.cache import cache
+from . import tokens
+
+def token_cache_key(key):
+    # O token em si não vai para o cache, só o hash
+    return 'auth-token:' + hashlib.sha256(key.encode()).hexdigest()
+
+def invalidate_token(key):
+    cache.delete(token_cache_key(key))
+
+def invalidate_user_tokens(user_id):
+    keys = Token.objects.filter(user_id=user_id).values_list('key', flat=True)
+    cache.delete_many([token_cache_key(key) for key in keys])
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication que guarda o token (com o usuário) no cache por
+    AUTH_TOKEN_CACHE_TTL segundos, evitando a consulta Token ⨝ User a cada
+    requisição. Signout, exclusão do token e alterações do usuário
+    (ex.: desativação) invalidam a entrada (ver accounts/signals.py)
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        token = cache.get(cache_key)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(cache_key, token, settings.AUTH_TOKEN_CACHE_TTL)
+            return user, token
+        
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return token.user, token
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    Access tokens assinados (AUTH_TOKEN_MODE='signed'), no mesmo header
+    "Authorization: Token <token>" usado hoje (também aceita "Bearer").
+    A verificação não consulta o banco: request.user é montado a partir do
+    token (id, email e nome) e request.auth traz as claims.
+    
+    Tokens que não são assinados ficam para a próxima classe, para que os
+    tokens antigos do DRF continuem valendo durante a troca de modo
+    """
+    keywords = (b'token', b'bearer')
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if len(auth) != 2 or auth[0].lower() not in self.keywords:
+            return None
+        try:
+            token = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. Token string should not contain invalid characters.'))
+        if not tokens.is_signed(token):
+            return None
+        
+        try:
+            return tokens.verify_access(token)
+        except tokens.InvalidToken:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+    def authenticate_header(self, request):
+        return 'Token'
@@ -0,0 +1,66 @@
+
+from django.conf import settings
+from contacts.models import SafeContact, EmergencyContact
+from contacts.serializers import SafeContactSerializer, EmergencyContactSerializer
+from emergency.models import EmergencyAlert
+from emergency.serializers import EmergencyAlertSerializer
+from lia_project.cache import cache, invalidate_version, versioned_key
+from .models import UserProfile, UserDisguiseSettings
+from .serializers import UserProfileSerializer
+
+SNAPSHOT_PREFIX = 'accounts:bootstrap'
+
+def disguise_data(disguise):
+    # A senha do disfarce nunca sai do servidor
+    if disguise is None:
+        return {'fake_app_name': UserDisguiseSettings._meta.get_field('fake_app_name').default, 'is_active': False, 'has_password': False}
+    return {
+        'fake_app_name': disguise.fake_app_name,
+        'is_active': disguise.is_active,
+        'has_password': bool(disguise.disguise_password),
+    }
+
+def build_snapshot(user, context):
+    """Perfil, disfarce e as duas listas de contatos, em três consultas"""
+    profile = (
+        UserProfile.objects.select_related('user', 'user__disguise_settings')
+        .filter(user_id=user.pk).first()
+    )
+    if profile is None:
+        profile, _ = UserProfile.objects.get_or_create(user_id=user.pk)
+        profile = UserProfile.objects.select_related('user', 'user__disguise_settings').get(pk=profile.pk)
+    try:
+        disguise = profile.user.disguise_settings
+    except UserDisguiseSettings.DoesNotExist:
+        disguise = None
+    
+    return {
+        'profile': UserProfileSerializer(profile, context=context).data,
+        'disguise_settings': disguise_data(disguise),
+        'safe_contacts': SafeContactSerializer(
+            SafeContact.objects.filter(user_id=user.pk).order_by('name', 'id'), many=True, context=context
+        ).data,
+        'emergency_contacts': EmergencyContactSerializer(
+            EmergencyContact.objects.filter(user_id=user.pk).order_by('name', 'id'), many=True, context=context
+        ).data,
+    }
+
+def get_snapshot(user, context):
+    """
+    Snapshot em cache por usuário, com chave versionada (versioned_key):
+    gravações incrementam a versão (ver accounts.signals)
+    """
+    key = versioned_key(SNAPSHOT_PREFIX, user.pk)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_snapshot(user, context)
+        cache.set(key, snapshot, settings.BOOTSTRAP_CACHE_TTL)
+    return snapshot
+
+def latest_alert(user, context):
+    # Fora do snapshot: o status do alerta muda pelos workers, via update()
+    alert = EmergencyAlert.objects.filter(user_id=user.pk).order_by('-created_at', '-id').with_deliveries().first()
+    return EmergencyAlertSerializer(alert, context=context).data if alert else None
+
+def invalidate(user_id):
+    invalidate_version(SNAPSHOT_PREFIX, user_id)
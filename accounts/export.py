@@ -0,0 +1,180 @@
+
+import io
+import os
+import re
+import zipfile
+from datetime import timedelta
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+from contacts.models import SafeContact, EmergencyContact
+from diary.models import DiaryEntry, DiaryAttachment
+from emergency.models import EmergencyAlert, EmergencyAlertDelivery, EmergencyAlertLocation
+from .models import User
+
+CHUNK_SIZE = 500
+FLUSH_SIZE = 64 * 1024
+FILE_BLOCK_SIZE = 1024 * 1024
+EXPORTS_DIR = 'exports'
+UNSAFE_CHARACTERS = re.compile(r'[^\w .-]')
+
+# Formatos já comprimidos vão sem DEFLATE: só gastaria CPU
+STORED_PREFIXES = ('image/', 'video/', 'audio/')
+
+class ZipSink:
+    """Destino do ZipFile que só acumula bytes; sem seek, o zipfile grava em fluxo"""
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+def record_sets(user):
+    """(arquivo, queryset, campos) de cada conjunto de registros exportado"""
+    return [
+        ('diary/entries.ndjson', DiaryEntry.objects.filter(user=user).order_by('created_at', 'id'),
+            ('id', 'title', 'content', 'date', 'mood', 'location', 'attachments', 'created_at', 'updated_at')),
+        ('contacts/safe_contacts.ndjson', SafeContact.objects.filter(user=user).order_by('created_at', 'id'),
+            ('id', 'name', 'phone', 'email', 'relationship', 'created_at', 'updated_at')),
+        ('contacts/emergency_contacts.ndjson', EmergencyContact.objects.filter(user=user).order_by('created_at', 'id'),
+            ('id', 'name', 'telegram_id', 'relationship', 'created_at', 'updated_at')),
+        ('emergency/alerts.ndjson', EmergencyAlert.objects.filter(user=user).order_by('created_at', 'id'),
+            ('id', 'message', 'location', 'status', 'created_at', 'updated_at')),
+        ('emergency/deliveries.ndjson', EmergencyAlertDelivery.objects.filter(alert__user=user).order_by('created_at', 'id'),
+            ('id', 'alert_id', 'contact_id', 'channel', 'status', 'attempts', 'sent_at', 'created_at')),
+        ('emergency/locations.ndjson', EmergencyAlertLocation.objects.filter(alert__user=user).order_by('alert_id', 'recorded_at'),
+            ('alert_id', 'latitude', 'longitude', 'accuracy', 'recorded_at')),
+    ]
+
+def safe_filename(name):
+    """Nome enviado pelo cliente reduzido a um nome de arquivo simples (sem '../' nem diretórios)"""
+    name = UNSAFE_CHARACTERS.sub('_', os.path.basename(name.replace('\\', '/'))).lstrip('.')
+    return name[:200] or 'arquivo'
+
+def attachment_path(attachment):
+    # Conteúdo deduplicado aparece uma vez no ZIP, mesmo anexado a várias entradas
+    key = attachment.blob.sha256 if attachment.blob_id else attachment.id
+    return f'diary/attachments/{key}/{safe_filename(attachment.name)}'
+
+def generate(user):
+    """
+    Gerar o ZIP da conta em pedaços de bytes: registros em NDJSON e os
+    arquivos dos anexos. Lê o banco com cursores (iterator) e os arquivos em
+    blocos, então a memória não cresce com o tamanho da conta
+    """
+    sink = ZipSink()
+    encoder = JSONEncoder(ensure_ascii=False)
+    
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+        # Do banco: com tokens assinados, request.user só tem id, email e nome
+        account = User.objects.filter(pk=user.pk).values('id', 'email', 'name', 'phone', 'created_at').get()
+        account['exported_at'] = timezone.now()
+        archive.writestr('account.json', encoder.encode(account))
+        
+        for name, queryset, fields in record_sets(user):
+            with archive.open(name, 'w', force_zip64=True) as member:
+                for row in queryset.values(*fields).iterator(chunk_size=CHUNK_SIZE):
+                    member.write((encoder.encode(row) + '\n').encode('utf-8'))
+                    if sink.size >= FLUSH_SIZE:
+                        yield sink.drain()
+            yield sink.drain()
+        
+        attachments = (
+            DiaryAttachment.objects.filter(entry__user=user)
+            .select_related('blob')
+            .order_by('created_at', 'id')
+        )
+        written = set()
+        with archive.open('diary/attachments.ndjson', 'w', force_zip64=True) as member:
+            for attachment in attachments.iterator(chunk_size=CHUNK_SIZE):
+                member.write((encoder.encode({
+                    'id': attachment.id,
+                    'entry_id': attachment.entry_id,
+                    'name': attachment.name,
+                    'file_type': attachment.file_type,
+                    'path': attachment_path(attachment),
+                    'created_at': attachment.created_at,
+                }) + '\n').encode('utf-8'))
+        yield sink.drain()
+        
+        for attachment in attachments.iterator(chunk_size=CHUNK_SIZE):
+            path = attachment_path(attachment)
+            if path in written or not attachment.file:
+                continue
+            written.add(path)
+            
+            info = zipfile.ZipInfo(path, date_time=timezone.localtime(attachment.created_at).timetuple()[:6])
+            if attachment.file_type.startswith(STORED_PREFIXES):
+                info.compress_type = zipfile.ZIP_STORED
+            else:
+                info.compress_type = zipfile.ZIP_DEFLATED
+            
+            try:
+                source = attachment.file.open('rb')
+            except FileNotFoundError:
+                continue
+            with source, archive.open(info, 'w', force_zip64=True) as member:
+                for block in iter(lambda: source.read(FILE_BLOCK_SIZE), b''):
+                    member.write(block)
+                    if sink.size >= FLUSH_SIZE:
+                        yield sink.drain()
+            yield sink.drain()
+    
+    # Diretório central, gravado ao fechar o ZipFile
+    yield sink.drain()
+
+class GeneratorReader(io.RawIOBase):
+    """Expõe os pedaços do generate() como arquivo legível, para Storage.save"""
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.buffer = b''
+    
+    def readable(self):
+        return True
+    
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.buffer += chunk
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+def export_filename():
+    return f"lia-export-{timezone.localdate().strftime('%Y%m%d')}.zip"
+
+def job_cache_key(user_id, job_id):
+    return f'account-export:{user_id}:{job_id}'
+
+def export_path(user_id, job_id):
+    return f'{EXPORTS_DIR}/{user_id}/{job_id}.zip'
+
+def prune(storage, max_age):
+    """Apagar do storage os ZIPs gerados há mais de max_age segundos"""
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    deleted = 0
+    if not storage.exists(EXPORTS_DIR):
+        return deleted
+    user_dirs, _ = storage.listdir(EXPORTS_DIR)
+    for user_dir in user_dirs:
+        _, names = storage.listdir(f'{EXPORTS_DIR}/{user_dir}')
+        for name in names:
+            path = f'{EXPORTS_DIR}/{user_dir}/{name}'
+            if storage.get_modified_time(path) < cutoff:
+                storage.delete(path)
+                deleted += 1
+    return deleted
@@ -0,0 +1,154 @@
+
+import json
+import logging
+import threading
+import redis
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils.dateparse import parse_datetime
+from .models import User, UserFeedback
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'accounts:feedback:pending'
+PROCESSING_KEY = 'accounts:feedback:processing'
+# Itens que o banco recusou repetidamente ou que não dá para ler
+DEAD_LETTER_KEY = 'accounts:feedback:dead'
+FAILURES_KEY = 'accounts:feedback:failures'
+LOCK_KEY = 'accounts:feedback:flush-lock'
+LOCK_TIMEOUT = 300
+
+_lock = threading.Lock()
+_client = None
+
+def client():
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = redis.Redis.from_url(
+                    settings.FEEDBACK_BUFFER_REDIS_URL, socket_connect_timeout=0.5, socket_timeout=0.5
+                )
+    return _client
+
+def enqueue(feedback):
+    """
+    Colocar um UserFeedback ainda não salvo (id e created_at já definidos)
+    na lista do Redis. Retorna False se o Redis não respondeu; aí quem chamou
+    grava direto no banco
+    """
+    payload = json.dumps({
+        'id': str(feedback.id),
+        'user_id': str(feedback.user_id) if feedback.user_id else None,
+        'feedback_type': feedback.feedback_type,
+        'content': feedback.content,
+        'created_at': feedback.created_at.isoformat(),
+    })
+    try:
+        client().lpush(PENDING_KEY, payload)
+    except redis.RedisError as exc:
+        logger.warning('Buffer de feedback indisponível (%s); gravando direto', exc)
+        return False
+    return True
+
+def _rows(raw_items):
+    """(bruto, UserFeedback) de cada item; itens ilegíveis vão para a lista de mortos"""
+    items, dead = [], []
+    for raw in raw_items:
+        try:
+            item = json.loads(raw)
+            items.append((raw, item, parse_datetime(item['created_at'])))
+        except (ValueError, KeyError, TypeError):
+            logger.error('Feedback ilegível no buffer: %r', raw[:200])
+            dead.append(raw)
+    
+    # Usuário apagado entre o envio e o flush: mesmo efeito do SET_NULL
+    user_ids = {item.get('user_id') for _, item, _ in items if item.get('user_id')}
+    existing = {str(pk) for pk in User.objects.filter(pk__in=user_ids).values_list('pk', flat=True)}
+    rows = []
+    for raw, item, created_at in items:
+        try:
+            rows.append((raw, UserFeedback(
+                id=item['id'],
+                user_id=item.get('user_id') if item.get('user_id') in existing else None,
+                feedback_type=item['feedback_type'],
+                content=item['content'],
+                created_at=created_at,
+            )))
+        except (KeyError, TypeError):
+            logger.error('Feedback ilegível no buffer: %r', raw[:200])
+            dead.append(raw)
+    return rows, dead
+
+def _save_each(rows):
+    """Gravar um a um; devolve os itens brutos que o banco recusou (ValueError: ex. NUL no texto)"""
+    rejected = []
+    for raw, row in rows:
+        try:
+            with transaction.atomic():
+                UserFeedback.objects.bulk_create([row], ignore_conflicts=True)
+        except (DatabaseError, ValueError):
+            logger.exception('Feedback recusado pelo banco: %r', raw[:200])
+            rejected.append(raw)
+    return rejected
+
+def flush(batch_size=None):
+    """
+    Mover lotes da lista pendente para a de processamento (RPOPLPUSH),
+    gravar com bulk_create e só então apagar a de processamento. Um flush
+    interrompido deixa os itens lá e o próximo recomeça por eles; como o id
+    vem do envio, a reentrega é ignorada pelo banco (ignore_conflicts).
+    
+    Um lote que falha FEEDBACK_FLUSH_MAX_ATTEMPTS vezes seguidas é gravado
+    item a item e os itens recusados vão para DEAD_LETTER_KEY, para não
+    travar a ingestão. Se todos falham (banco fora), o lote fica onde está.
+    
+    Retorna quantos itens foram gravados (0 se outro flush está rodando)
+    """
+    batch_size = batch_size or settings.FEEDBACK_FLUSH_BATCH_SIZE
+    redis_client = client()
+    lock = redis_client.lock(LOCK_KEY, timeout=LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        return 0
+    
+    flushed = 0
+    try:
+        while True:
+            # Cada lote renova o prazo; se o lock já expirou, outro flush pode estar com a lista
+            lock.extend(LOCK_TIMEOUT, replace_ttl=True)
+            raw_items = redis_client.lrange(PROCESSING_KEY, 0, -1)
+            if not raw_items:
+                pipe = redis_client.pipeline(transaction=False)
+                for _ in range(batch_size):
+                    pipe.rpoplpush(PENDING_KEY, PROCESSING_KEY)
+                raw_items = [raw for raw in pipe.execute() if raw is not None]
+            if not raw_items:
+                break
+            
+            rows, dead = _rows(raw_items)
+            try:
+                with transaction.atomic():
+                    UserFeedback.objects.bulk_create([row for _, row in rows], ignore_conflicts=True)
+            except (DatabaseError, ValueError):
+                if redis_client.incr(FAILURES_KEY) < settings.FEEDBACK_FLUSH_MAX_ATTEMPTS:
+                    raise
+                rejected = _save_each(rows)
+                if rows and len(rejected) == len(rows):
+                    raise
+                dead += rejected
+                rows = [(raw, row) for raw, row in rows if raw not in rejected]
+            
+            pipe = redis_client.pipeline()
+            if dead:
+                pipe.lpush(DEAD_LETTER_KEY, *dead)
+            pipe.delete(PROCESSING_KEY, FAILURES_KEY)
+            pipe.execute()
+            flushed += len(rows)
+    except redis.exceptions.LockError:
+        logger.warning('Flush de feedback perdeu o lock; o próximo continua')
+    finally:
+        try:
+            lock.release()
+        except redis.exceptions.LockError:
+            pass
+    return flushed
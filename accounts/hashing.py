@@ -0,0 +1,61 @@
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from django.conf import settings
+from django.db import connections
+from rest_framework.exceptions import Throttled
+
+class HashingBusy(Throttled):
+    default_detail = 'Servidor ocupado. Tente novamente em instantes.'
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+
+def _pool():
+    global _executor, _slots
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                # Vagas = hashes em execução + fila; além disso, rejeição imediata
+                _slots = threading.BoundedSemaphore(settings.AUTH_HASH_WORKERS + settings.AUTH_HASH_QUEUE_DEPTH)
+                _executor = ThreadPoolExecutor(max_workers=settings.AUTH_HASH_WORKERS, thread_name_prefix='auth-hash')
+    return _executor, _slots
+
+def _call(fn, args, kwargs):
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        # A thread do executor não passa pelo request_finished do Django
+        connections.close_all()
+
+def run(fn, *args, **kwargs):
+    """
+    Executar fn (authenticate, make_password...) no executor de hashing do
+    processo. Com todas as vagas ocupadas, ou se o resultado demorar mais que
+    AUTH_HASH_TIMEOUT, levanta HashingBusy (429) em vez de ocupar mais uma
+    thread do servidor com PBKDF2.
+    
+    O timeout só descarta trabalho que ainda está na fila (future.cancel());
+    um hash que já começou não pode ser interrompido, termina em segundo
+    plano e só então libera a vaga
+    """
+    if not settings.AUTH_ADMISSION_CONTROL:
+        return fn(*args, **kwargs)
+    
+    executor, slots = _pool()
+    if not slots.acquire(blocking=False):
+        raise HashingBusy(wait=1)
+    try:
+        future = executor.submit(_call, fn, args, kwargs)
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    
+    try:
+        return future.result(timeout=settings.AUTH_HASH_TIMEOUT)
+    except TimeoutError:
+        # Na fila: sai dela e a vaga é liberada pelo callback. Rodando: segue até o fim
+        future.cancel()
+        raise HashingBusy(wait=1)
@@ -0,0 +1,48 @@
+
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+from accounts.authentication import CachedTokenAuthentication, invalidate_token
+from accounts.models import User
+from accounts.views import UserProfileView
+
+class Command(BaseCommand):
+    help = (
+        'Compara TokenAuthentication e CachedTokenAuthentication: consultas ao banco '
+        'e tempo por requisição autenticada (GET /api/auth/profile/)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(
+            username=f'bench-{uuid.uuid4()}', email=f'bench-{uuid.uuid4()}@example.com', name='Bench'
+        )
+        token, _ = Token.objects.get_or_create(user=user)
+        try:
+            for authentication in (TokenAuthentication, CachedTokenAuthentication):
+                invalidate_token(token.key)
+                self._run(authentication, token.key, options['requests'])
+        finally:
+            user.delete()
+
+    def _run(self, authentication, key, requests):
+        factory = APIRequestFactory()
+        view = UserProfileView.as_view(authentication_classes=[authentication])
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(requests):
+                response = view(factory.get('/api/auth/profile/', HTTP_AUTHORIZATION=f'Token {key}'))
+                assert response.status_code == 200, response.status_code
+        elapsed = time.perf_counter() - started
+        auth_queries = sum('authtoken_token' in query['sql'] for query in queries.captured_queries)
+        self.stdout.write(
+            f'{authentication.__name__}: {len(queries) / requests:.2f} consultas/requisição '
+            f'({auth_queries} de token em {requests}), {elapsed / requests * 1000:.2f} ms/requisição'
+        )
@@ -0,0 +1,92 @@
+
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+import requests
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+from accounts import feedback
+from accounts.models import UserFeedback
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0
+
+class _ThreadingServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+class Command(BaseCommand):
+    help = (
+        'Rajada de POST /api/auth/feedback/ com gravação direta e com o buffer '
+        'no Redis (FEEDBACK_BUFFERED): latência p50/p99 do envio e, no modo '
+        'bufferizado, tempo do flush e conferência de que nada se perdeu'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=32)
+        parser.add_argument('--rate', type=float, default=100, help='Envios por segundo (somando os clientes)')
+        parser.add_argument('--duration', type=float, default=10)
+
+    def handle(self, *args, **options):
+        server = make_server('127.0.0.1', 0, get_wsgi_application(), server_class=_ThreadingServer, handler_class=_QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+        try:
+            for buffered in (False, True):
+                with override_settings(FEEDBACK_BUFFERED=buffered, ALLOWED_HOSTS=['127.0.0.1']):
+                    self._run(base_url, buffered, options)
+        finally:
+            server.shutdown()
+
+    def _client(self, base_url, marker, stop, latencies, statuses, interval):
+        session = requests.Session()
+        next_at = time.perf_counter() + random.random() * interval
+        # Carga aberta: a mesma taxa de envios nos dois modos
+        while not stop.wait(max(0, next_at - time.perf_counter())):
+            next_at += interval
+            started = time.perf_counter()
+            response = session.post(
+                f'{base_url}/api/auth/feedback/', json={'feedback_type': 'outro', 'content': marker}
+            )
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+
+    def _run(self, base_url, buffered, options):
+        marker = f'bench-{uuid.uuid4()}'
+        latencies, statuses = [], Counter()
+        stop = threading.Event()
+        interval = options['clients'] / options['rate']
+        clients = [
+            threading.Thread(target=self._client, args=(base_url, marker, stop, latencies, statuses, interval))
+            for _ in range(options['clients'])
+        ]
+        for thread in clients:
+            thread.start()
+        time.sleep(options['duration'])
+        stop.set()
+        for thread in clients:
+            thread.join()
+        
+        label = 'bufferizado' if buffered else 'gravação direta'
+        self.stdout.write(
+            f"{label}: {len(latencies)} envios, p50 {_percentile(latencies, 0.5) * 1000:.1f} ms / "
+            f"p99 {_percentile(latencies, 0.99) * 1000:.1f} ms, status {dict(sorted(statuses.items()))}"
+        )
+        if buffered:
+            started = time.perf_counter()
+            flushed = feedback.flush()
+            self.stdout.write(f"  flush: {flushed} itens em {(time.perf_counter() - started) * 1000:.0f} ms")
+        
+        accepted = statuses[201] + statuses[202]
+        stored = UserFeedback.objects.filter(content=marker).count()
+        self.stdout.write(f"  no banco: {stored} de {accepted} aceitos")
+        UserFeedback.objects.filter(content=marker).delete()
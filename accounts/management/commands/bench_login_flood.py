@@ -0,0 +1,132 @@
+
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+from accounts.models import User
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0
+
+class _ThreadingServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+class Command(BaseCommand):
+    help = (
+        'Inunda /api/auth/signin com senhas erradas e mede a latência de '
+        '/api/emergency/alert antes e durante a inundação, com e sem o controle '
+        'de admissão (AUTH_ADMISSION_CONTROL). Sobe um servidor WSGI com threads '
+        'no próprio processo'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flood-threads', type=int, default=32)
+        parser.add_argument('--rate', type=float, default=50, help='Tentativas de signin por segundo (somando as threads)')
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument('--probe-interval', type=float, default=0.1)
+        parser.add_argument('--mode', choices=['both', 'off', 'on'], default='both')
+        parser.add_argument(
+            '--spread-ips', action='store_true',
+            help='Cada tentativa vem de um IP diferente (X-Forwarded-For), como num ataque distribuído'
+        )
+
+    def handle(self, *args, **options):
+        password = uuid.uuid4().hex
+        user = User.objects.create_user(
+            username=f'bench-{uuid.uuid4()}', email=f'bench-{uuid.uuid4()}@example.com',
+            name='Bench', password=password
+        )
+        token, _ = Token.objects.get_or_create(user=user)
+        server = make_server('127.0.0.1', 0, get_wsgi_application(), server_class=_ThreadingServer, handler_class=_QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+        
+        overrides = {'OUTBOX_EAGER_RELAY': False, 'ALLOWED_HOSTS': ['127.0.0.1']}
+        if options['spread_ips']:
+            overrides['REST_FRAMEWORK'] = dict(settings.REST_FRAMEWORK, NUM_PROXIES=1)
+        try:
+            modes = {'both': [False, True], 'off': [False], 'on': [True]}[options['mode']]
+            for admission in modes:
+                with override_settings(AUTH_ADMISSION_CONTROL=admission, **overrides):
+                    self._run(base_url, token.key, admission, options)
+        finally:
+            server.shutdown()
+            user.delete()
+
+    def _probe(self, base_url, key, stop, latencies):
+        session = requests.Session()
+        headers = {'Authorization': f'Token {key}'}
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = session.post(
+                f'{base_url}/api/emergency/alert', json={'message': 'Benchmark', 'contacts': []}, headers=headers
+            )
+            if response.status_code == 202:
+                latencies.append(time.perf_counter() - started)
+            stop.wait(self.probe_interval)
+
+    def _flood(self, base_url, stop, statuses, spread_ips, interval):
+        session = requests.Session()
+        next_at = time.perf_counter() + random.random() * interval
+        # Carga aberta: cada thread mantém seu ritmo, responda o servidor rápido (429) ou não
+        while not stop.wait(max(0, next_at - time.perf_counter())):
+            next_at += interval
+            headers = {}
+            if spread_ips:
+                headers['X-Forwarded-For'] = f'10.{random.randint(0, 255)}.{random.randint(0, 255)}.{random.randint(1, 254)}'
+            response = session.post(
+                f'{base_url}/api/auth/signin',
+                json={'email': f'victim-{random.randint(0, 10 ** 6)}@example.com', 'password': 'wrong'},
+                headers=headers
+            )
+            statuses[response.status_code] += 1
+
+    def _run(self, base_url, key, admission, options):
+        self.probe_interval = options['probe_interval']
+        baseline, flooded, statuses = [], [], Counter()
+        
+        stop = threading.Event()
+        probe = threading.Thread(target=self._probe, args=(base_url, key, stop, baseline))
+        probe.start()
+        time.sleep(min(3, options['duration'] / 2))
+        stop.set()
+        probe.join()
+        
+        stop = threading.Event()
+        interval = options['flood_threads'] / options['rate']
+        flooders = [
+            threading.Thread(target=self._flood, args=(base_url, stop, statuses, options['spread_ips'], interval), daemon=True)
+            for _ in range(options['flood_threads'])
+        ]
+        for thread in flooders:
+            thread.start()
+        time.sleep(0.5)
+        probe = threading.Thread(target=self._probe, args=(base_url, key, stop, flooded))
+        probe.start()
+        time.sleep(options['duration'])
+        stop.set()
+        probe.join()
+        for thread in flooders:
+            thread.join()
+        
+        label = 'com controle de admissão' if admission else 'sem controle de admissão'
+        self.stdout.write(
+            f"{label}: alerta p50 {_percentile(baseline, 0.5) * 1000:.1f} ms / p99 {_percentile(baseline, 0.99) * 1000:.1f} ms "
+            f"sem carga; p50 {_percentile(flooded, 0.5) * 1000:.1f} ms / p99 {_percentile(flooded, 0.99) * 1000:.1f} ms "
+            f"durante a inundação ({len(flooded)} alertas)"
+        )
+        self.stdout.write(f"  signin: {sum(statuses.values())} tentativas, status {dict(sorted(statuses.items()))}")
@@ -1,6 +1,7 @@
 
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 import uuid
 
 class User(AbstractUser):
@@ -52,8 +53,29 @@ class UserFeedback(models.Model):
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     feedback_type = models.CharField(max_length=20, choices=FEEDBACK_TYPES, default='sugestão')
     content = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Horário do envio, não da gravação: o flush do buffer grava depois
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.feedback_type} - {self.content[:50]}..."
+
+class RefreshToken(models.Model):
+    """
+    Sessão do modo de tokens assinados (AUTH_TOKEN_MODE='signed'). Cada
+    renovação revoga a linha usada e cria outra; reapresentar um refresh já
+    revogado indica vazamento e encerra todas as sessões do usuário
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='refresh_tokens')
+    expires_at = models.DateTimeField()
+    revoked_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'revoked_at'], name='refresh_token_user_active'),
+        ]
+
+    def __str__(self):
+        return f"Refresh token of {self.user_id}"
@@ -1,6 +1,8 @@
 
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from . import hashing
 from .models import User, UserProfile, UserFeedback
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -11,12 +13,11 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         fields = ('email', 'password', 'name')
     
     def create(self, validated_data):
-        user = User.objects.create_user(
-            username=validated_data['email'],
-            email=validated_data['email'],
-            password=validated_data['password'],
-            name=validated_data['name']
-        )
+        email = User.objects.normalize_email(validated_data['email'])
+        user = User(username=email, email=email, name=validated_data['name'])
+        # Só o PBKDF2 vai para o executor de hashing; o INSERT fica na requisição
+        user.password = hashing.run(make_password, validated_data['password'])
+        user.save()
         return user
 
 class UserLoginSerializer(serializers.Serializer):
@@ -28,7 +29,7 @@ class UserLoginSerializer(serializers.Serializer):
         password = data.get('password')
         
         if email and password:
-            user = authenticate(username=email, password=password)
+            user = hashing.run(authenticate, username=email, password=password)
             if user:
                 if user.is_active:
                     data['user'] = user
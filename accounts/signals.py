@@ -1,8 +1,13 @@
 
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from rest_framework.authtoken.models import Token
-from .models import User, UserProfile
+from .authentication import invalidate_token, invalidate_user_tokens
+from contacts.models import SafeContact, EmergencyContact
+from . import bootstrap
+from .models import User, UserProfile, UserDisguiseSettings
+from .tokens import revoke_user
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -15,3 +20,37 @@ def create_auth_token(sender, instance, created, **kwargs):
     """Criar token de autenticação automaticamente quando um usuário é criado"""
     if created:
         Token.objects.create(user=instance)
+
+@receiver(post_save, sender=User)
+def invalidate_cached_tokens(sender, instance, created, update_fields=None, **kwargs):
+    """Usuário alterado (ex.: desativado) não pode continuar valendo pelo cache"""
+    if created or (update_fields is not None and set(update_fields) == {'last_login'}):
+        return
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_user_tokens(user_id))
+    if not instance.is_active:
+        transaction.on_commit(lambda: revoke_user(user_id))
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Signout (ou token removido no admin) revoga o token também no cache"""
+    key = instance.key
+    invalidate_token(key)
+    # De novo após o commit: uma requisição concorrente pode ter recolocado o token
+    transaction.on_commit(lambda: invalidate_token(key))
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_save, sender=UserDisguiseSettings)
+@receiver(post_delete, sender=UserDisguiseSettings)
+@receiver(post_save, sender=SafeContact)
+@receiver(post_delete, sender=SafeContact)
+@receiver(post_save, sender=EmergencyContact)
+@receiver(post_delete, sender=EmergencyContact)
+def invalidate_bootstrap(sender, instance, update_fields=None, **kwargs):
+    """Dados do snapshot de /api/auth/bootstrap mudaram"""
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    user_id = instance.pk if sender is User else instance.user_id
+    transaction.on_commit(lambda: bootstrap.invalidate(user_id))
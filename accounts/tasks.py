@@ -0,0 +1,43 @@
+
+from celery import shared_task
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from lia_project.cache import cache
+from .models import User, RefreshToken
+from . import export, feedback
+
+@shared_task(acks_late=True)
+def export_account(user_id, job_id):
+    """Gravar o ZIP da conta no storage (fila 'bulk') e registrar o caminho no cache"""
+    key = export.job_cache_key(user_id, job_id)
+    user = User.objects.filter(pk=user_id).first()
+    if user is None:
+        cache.set(key, {'status': 'failed'}, settings.ACCOUNT_EXPORT_TTL)
+        return None
+    
+    try:
+        reader = export.GeneratorReader(export.generate(user))
+        name = default_storage.save(export.export_path(user_id, job_id), File(reader, name=export.export_filename()))
+    except Exception:
+        cache.set(key, {'status': 'failed'}, settings.ACCOUNT_EXPORT_TTL)
+        raise
+    cache.set(key, {'status': 'ready', 'name': name}, settings.ACCOUNT_EXPORT_TTL)
+    return name
+
+@shared_task
+def prune_account_exports():
+    """Apagar os ZIPs de exportação mais velhos que ACCOUNT_EXPORT_TTL"""
+    return export.prune(default_storage, settings.ACCOUNT_EXPORT_TTL)
+
+@shared_task
+def prune_refresh_tokens():
+    """Apagar sessões de tokens assinados já expiradas"""
+    deleted, _ = RefreshToken.objects.filter(expires_at__lt=timezone.now()).delete()
+    return deleted
+
+@shared_task
+def flush_feedback():
+    """Gravar em lote os feedbacks acumulados no buffer do Redis"""
+    return feedback.flush()
@@ -0,0 +1,77 @@
+
+import hashlib
+import time
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+from lia_project.cache import cache
+
+PERIODS = {'s': 1, 'sec': 1, 'm': 60, 'min': 60, 'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}
+
+def parse_rate(rate):
+    """'10/min' -> (10, 60)"""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period]
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Limite em janela deslizante aproximada: contador da janela atual mais o
+    da anterior, ponderado pelo tempo restante dela. Dois contadores por
+    identidade no Redis (cache 'default'), incrementados atomicamente.
+    
+    A taxa vem de AUTH_THROTTLE_RATES[scope]. A identidade padrão é o IP do
+    cliente; subclasses sobrescrevem get_ident_key (None = não limitar)
+    """
+    scope = None
+
+    def get_ident_key(self, request):
+        return self.get_ident(request)
+
+    def allow_request(self, request, view):
+        if not settings.AUTH_ADMISSION_CONTROL:
+            return True
+        ident = self.get_ident_key(request)
+        if ident is None:
+            return True
+        
+        limit, period = parse_rate(settings.AUTH_THROTTLE_RATES[self.scope])
+        now = time.time()
+        window, elapsed = divmod(now, period)
+        current_key = f'throttle:{self.scope}:{ident}:{int(window)}'
+        previous_key = f'throttle:{self.scope}:{ident}:{int(window) - 1}'
+        
+        cache.add(current_key, 0, period * 2)
+        try:
+            count = cache.incr(current_key)
+        except ValueError:
+            # Expirou entre o add e o incr
+            cache.add(current_key, 1, period * 2)
+            count = 1
+        previous = cache.get(previous_key) or 0
+        
+        weight = (period - elapsed) / period
+        if previous * weight + count <= limit:
+            return True
+        
+        # Espera até o peso da janela anterior cair o suficiente (ou a janela virar)
+        if previous and count <= limit:
+            self.wait_seconds = max(1, (previous * weight + count - limit) / previous * period)
+        else:
+            self.wait_seconds = period - elapsed
+        return False
+
+    def wait(self):
+        return getattr(self, 'wait_seconds', None)
+
+class AuthIPThrottle(SlidingWindowThrottle):
+    """Tentativas de signin/signup por IP"""
+    scope = 'auth_ip'
+
+class AuthEmailThrottle(SlidingWindowThrottle):
+    """Tentativas de signin/signup por email (credential stuffing de vários IPs)"""
+    scope = 'auth_email'
+
+    def get_ident_key(self, request):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if not isinstance(email, str) or not email:
+            return None
+        return hashlib.sha256(email.strip().lower().encode()).hexdigest()[:32]
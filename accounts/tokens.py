@@ -0,0 +1,142 @@
+
+import logging
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from lia_project.cache import cache
+from .models import User, RefreshToken
+import uuid
+
+ACCESS_SALT = 'accounts.tokens.access'
+REFRESH_SALT = 'accounts.tokens.refresh'
+
+logger = logging.getLogger(__name__)
+
+class InvalidToken(Exception):
+    pass
+
+def _dumps(payload, salt):
+    return signing.dumps(payload, key=settings.AUTH_SIGNING_KEY, salt=salt, compress=True)
+
+def _loads(token, salt, max_age):
+    try:
+        return signing.loads(token, key=settings.AUTH_SIGNING_KEY, salt=salt, max_age=max_age)
+    except signing.BadSignature:
+        raise InvalidToken()
+
+def is_signed(token):
+    # Tokens do DRF são 40 caracteres hex; os assinados têm ':' separando assinatura e data
+    return ':' in token
+
+def session_revoked_key(session_id):
+    return f'auth-revoked-session:{uuid.UUID(str(session_id)).hex}'
+
+def user_revoked_key(user_id):
+    return f'auth-revoked-user:{uuid.UUID(str(user_id)).hex}'
+
+def revocations():
+    # Só o cache compartilhado: o fallback local do ResilientCache não vê
+    # revogações feitas em outros processos
+    return caches[cache.primary]
+
+def _revoke(key, value):
+    try:
+        revocations().set(key, value, settings.AUTH_ACCESS_TOKEN_TTL)
+    except Exception:
+        # Enquanto o cache estiver fora, verify_access recusa tudo; a sessão já
+        # foi revogada no banco, então o refresh também não volta a valer
+        logger.exception('Não foi possível gravar a revogação %s', key)
+
+def issue(user, session=None):
+    """
+    Criar (ou, com session, renovar) uma sessão e devolver o par de tokens.
+    O access token leva id, email e nome do usuário, então verificá-lo não
+    consulta o banco
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        if session is not None:
+            session.revoked_at = now
+            session.save(update_fields=['revoked_at'])
+        session = RefreshToken.objects.create(
+            user=user, expires_at=now + timedelta(seconds=settings.AUTH_REFRESH_TOKEN_TTL)
+        )
+    
+    access = _dumps({
+        'u': user.id.hex,
+        'e': user.email,
+        'n': user.name,
+        's': session.id.hex,
+        # Emissão em milissegundos, comparada com o corte de revoke_user
+        'i': time.time_ns() // 1_000_000,
+    }, ACCESS_SALT)
+    refresh = _dumps({'s': session.id.hex}, REFRESH_SALT)
+    return {
+        'access_token': access,
+        'refresh_token': refresh,
+        'expires_in': settings.AUTH_ACCESS_TOKEN_TTL,
+    }
+
+def verify_access(token):
+    """
+    Validar assinatura, validade e a lista de revogação (cache compartilhado)
+    e montar o usuário a partir do próprio token. Levanta InvalidToken
+    """
+    claims = _loads(token, ACCESS_SALT, settings.AUTH_ACCESS_TOKEN_TTL)
+    try:
+        user_id, session_id, issued_at = uuid.UUID(claims['u']), claims['s'], claims['i']
+        session_key, user_key = session_revoked_key(session_id), user_revoked_key(user_id)
+    except (KeyError, TypeError, ValueError):
+        raise InvalidToken()
+    
+    # Lista de revogação compacta: só sessões e usuários revogados, e só pelo
+    # tempo de vida de um access token. Sem o cache compartilhado não há como
+    # saber o que foi revogado: falha fechada
+    try:
+        revoked = revocations().get_many([session_key, user_key])
+    except Exception as exc:
+        logger.warning('Lista de revogação indisponível (%s); token recusado', exc)
+        raise InvalidToken()
+    if session_key in revoked:
+        raise InvalidToken()
+    cutoff = revoked.get(user_key)
+    if cutoff is not None and issued_at <= cutoff:
+        raise InvalidToken()
+    
+    user = User(id=user_id, email=claims.get('e', ''), name=claims.get('n', ''), is_active=True)
+    user.username = user.email
+    user._state.adding = False
+    return user, claims
+
+def refresh(token):
+    """
+    Trocar um refresh token válido por um novo par (rotação). Retorna
+    (usuário, tokens); levanta InvalidToken
+    """
+    claims = _loads(token, REFRESH_SALT, settings.AUTH_REFRESH_TOKEN_TTL)
+    try:
+        session = RefreshToken.objects.select_related('user').filter(pk=uuid.UUID(str(claims['s']))).first()
+    except (KeyError, TypeError, ValueError):
+        raise InvalidToken()
+    if session is None or session.expires_at <= timezone.now() or not session.user.is_active:
+        raise InvalidToken()
+    if session.revoked_at is not None:
+        # Refresh reutilizado: alguém mais tem uma cópia
+        revoke_user(session.user_id)
+        raise InvalidToken()
+    return session.user, issue(session.user, session=session)
+
+def revoke_session(session_id):
+    """Signout: o refresh para de valer e os access tokens da sessão também"""
+    RefreshToken.objects.filter(pk=session_id, revoked_at__isnull=True).update(revoked_at=timezone.now())
+    _revoke(session_revoked_key(session_id), 1)
+
+def revoke_user(user_id):
+    """Encerrar todas as sessões do usuário (ex.: conta desativada)"""
+    RefreshToken.objects.filter(user_id=user_id, revoked_at__isnull=True).update(revoked_at=timezone.now())
+    # Access tokens emitidos até agora deixam de valer; a entrada expira junto com eles
+    _revoke(user_revoked_key(user_id), time.time_ns() // 1_000_000)
@@ -6,6 +6,10 @@ urlpatterns = [
     path('signup', views.signup, name='signup'),
     path('signin', views.signin, name='signin'),
     path('signout', views.signout, name='signout'),
+    path('refresh', views.refresh, name='refresh'),
+    path('bootstrap', views.bootstrap_view, name='bootstrap'),
     path('profile/', views.UserProfileView.as_view(), name='user-profile'),
+    path('export', views.account_export, name='account-export'),
+    path('export/<uuid:job_id>', views.account_export_job, name='account-export-job'),
     path('feedback/', views.UserFeedbackView.as_view(), name='user-feedback'),
 ]
@@ -1,11 +1,19 @@
 
 from rest_framework import status, generics
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, throttle_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
+from django.conf import settings
 from django.contrib.auth import login, logout
+from django.core.files.storage import default_storage
+from django.http import FileResponse, StreamingHttpResponse
+from lia_project.cache import cache
 from .models import User, UserProfile, UserFeedback
+from . import bootstrap, export, feedback, tokens
+from .tasks import export_account
+from .throttling import AuthIPThrottle, AuthEmailThrottle
+import uuid
 from .serializers import (
     UserRegistrationSerializer, 
     UserLoginSerializer, 
@@ -13,16 +21,32 @@ from .serializers import (
     UserFeedbackSerializer
 )
 
+def issue_session(user):
+    """
+    Bloco 'session' da resposta de signup/signin. No modo assinado
+    (AUTH_TOKEN_MODE='signed') inclui refresh_token e expires_in
+    """
+    if settings.AUTH_TOKEN_MODE == 'signed':
+        session = tokens.issue(user)
+    else:
+        token, created = Token.objects.get_or_create(user=user)
+        session = {'access_token': token.key}
+    session['user'] = {
+        'id': str(user.id),
+        'email': user.email
+    }
+    return session
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([AuthIPThrottle, AuthEmailThrottle])
 def signup(request):
     serializer = UserRegistrationSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.save()
-        token, created = Token.objects.get_or_create(user=user)
         
-        # Criar perfil do usuário
-        UserProfile.objects.create(user=user)
+        # Criar perfil do usuário (o signal post_save normalmente já criou)
+        UserProfile.objects.get_or_create(user=user)
         
         return Response({
             'user': {
@@ -31,25 +55,22 @@ def signup(request):
                 'name': user.name,
                 'user_metadata': {'name': user.name}
             },
-            'session': {
-                'access_token': token.key,
-                'user': {
-                    'id': str(user.id),
-                    'email': user.email
-                }
-            }
+            'session': issue_session(user)
         }, status=status.HTTP_201_CREATED)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([AuthIPThrottle, AuthEmailThrottle])
 def signin(request):
     serializer = UserLoginSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.validated_data['user']
-        token, created = Token.objects.get_or_create(user=user)
-        login(request, user)
+        session = issue_session(user)
+        if settings.AUTH_TOKEN_MODE != 'signed':
+            # Sessão do Django só no modo clássico; no assinado nada é gravado no login
+            login(request, user)
         
         return Response({
             'user': {
@@ -57,13 +78,7 @@ def signin(request):
                 'email': user.email,
                 'user_metadata': {'name': user.name}
             },
-            'session': {
-                'access_token': token.key,
-                'user': {
-                    'id': str(user.id),
-                    'email': user.email
-                }
-            }
+            'session': session
         }, status=status.HTTP_200_OK)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -71,13 +86,84 @@ def signin(request):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def signout(request):
-    try:
-        request.user.auth_token.delete()
-    except:
-        pass
-    logout(request)
+    if isinstance(request.auth, dict):
+        # Token assinado: revoga a sessão (refresh e access tokens dela)
+        tokens.revoke_session(request.auth['s'])
+    else:
+        try:
+            request.user.auth_token.delete()
+        except:
+            pass
+        logout(request)
     return Response({'message': 'Logout realizado com sucesso'}, status=status.HTTP_200_OK)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def bootstrap_view(request):
+    """
+    Tudo o que o app precisa ao abrir, em uma requisição: perfil, disfarce,
+    contatos seguros, contatos de emergência e o último alerta
+    """
+    context = {'request': request}
+    data = dict(bootstrap.get_snapshot(request.user, context))
+    data['latest_alert'] = bootstrap.latest_alert(request.user, context)
+    return Response(data)
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def refresh(request):
+    """Trocar o refresh_token por um novo par de tokens (modo assinado)"""
+    if settings.AUTH_TOKEN_MODE != 'signed':
+        return Response({'error': 'Tokens assinados não estão habilitados'}, status=status.HTTP_404_NOT_FOUND)
+    
+    refresh_token = request.data.get('refresh_token')
+    if not isinstance(refresh_token, str):
+        return Response({'error': 'refresh_token é obrigatório'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        user, session = tokens.refresh(refresh_token)
+    except tokens.InvalidToken:
+        return Response({'error': 'Refresh token inválido ou expirado'}, status=status.HTTP_401_UNAUTHORIZED)
+    
+    session['user'] = {
+        'id': str(user.id),
+        'email': user.email
+    }
+    return Response({'session': session})
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def account_export(request):
+    """
+    GET: baixar o ZIP da conta (diário, contatos, alertas e anexos), gerado em
+    fluxo enquanto é enviado.
+    POST: gerar o ZIP em segundo plano; baixe depois em export/<job_id>
+    """
+    if request.method == 'POST':
+        job_id = uuid.uuid4()
+        cache.set(export.job_cache_key(request.user.id, job_id), {'status': 'pending'}, settings.ACCOUNT_EXPORT_TTL)
+        export_account.delay(str(request.user.id), str(job_id))
+        return Response({'job_id': str(job_id)}, status=status.HTTP_202_ACCEPTED)
+    
+    response = StreamingHttpResponse(export.generate(request.user), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{export.export_filename()}"'
+    return response
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def account_export_job(request, job_id):
+    job = cache.get(export.job_cache_key(request.user.id, job_id))
+    if job is None:
+        return Response({'error': 'Exportação não encontrada ou expirada'}, status=status.HTTP_404_NOT_FOUND)
+    if job['status'] != 'ready':
+        return Response({'status': job['status']}, status=status.HTTP_202_ACCEPTED if job['status'] == 'pending' else status.HTTP_200_OK)
+    
+    try:
+        source = default_storage.open(job['name'], 'rb')
+    except FileNotFoundError:
+        return Response({'error': 'Exportação não encontrada ou expirada'}, status=status.HTTP_404_NOT_FOUND)
+    return FileResponse(source, as_attachment=True, filename=export.export_filename())
+
 class UserProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]
@@ -87,11 +173,22 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
         return profile
 
 class UserFeedbackView(generics.CreateAPIView):
+    """
+    Com FEEDBACK_BUFFERED o envio validado vai para o buffer no Redis (202)
+    e é gravado em lote pelo flush_feedback do beat; sem Redis, grava direto (201)
+    """
     serializer_class = UserFeedbackSerializer
     permission_classes = [AllowAny]
     
-    def perform_create(self, serializer):
-        if self.request.user.is_authenticated:
-            serializer.save(user=self.request.user)
-        else:
-            serializer.save()
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = request.user if request.user.is_authenticated else None
+        
+        if settings.FEEDBACK_BUFFERED:
+            instance = UserFeedback(user=user, **serializer.validated_data)
+            if feedback.enqueue(instance):
+                return Response(self.get_serializer(instance).data, status=status.HTTP_202_ACCEPTED)
+        
+        serializer.save(user=user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -5,3 +5,6 @@ class ContactsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'contacts'
     verbose_name = 'Contatos'
+    
+    def ready(self):
+        import contacts.signals
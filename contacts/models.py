@@ -17,6 +17,10 @@ class SafeContact(models.Model):
         ordering = ['name']
         verbose_name = 'Contato Seguro'
         verbose_name_plural = 'Contatos Seguros'
+        indexes = [
+            models.Index(fields=['user', 'name', 'id'], name='safe_contact_user_keyset'),
+            models.Index(fields=['user', 'updated_at', 'id'], name='safe_contact_user_sync'),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.user.email}"
@@ -34,6 +38,10 @@ class EmergencyContact(models.Model):
         ordering = ['name']
         verbose_name = 'Contato de Emergência'
         verbose_name_plural = 'Contatos de Emergência'
+        indexes = [
+            models.Index(fields=['user', 'name', 'id'], name='emergency_contact_user_keyset'),
+            models.Index(fields=['user', 'updated_at', 'id'], name='emergency_contact_user_sync'),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.user.email}"
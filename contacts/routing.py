@@ -0,0 +1,31 @@
+
+from django.conf import settings
+from lia_project.cache import cache, invalidate_version, versioned_key
+from .models import EmergencyContact
+
+ROUTING_PREFIX = 'contacts:routing'
+
+def load_routing(user_id):
+    """Dados de envio direto do banco, sem passar pelo cache"""
+    return {
+        str(contact['id']): {'name': contact['name'], 'telegram_id': contact['telegram_id']}
+        for contact in EmergencyContact.objects.filter(user_id=user_id).values('id', 'name', 'telegram_id')
+    }
+
+def get_routing(user_id):
+    """
+    Dados de envio dos contatos de emergência do usuário, {id: {...}}.
+    
+    A chave do cache inclui uma versão por usuário; gravações nos contatos
+    incrementam a versão (ver contacts.signals), então leituras concorrentes
+    nunca voltam a publicar dados antigos na chave vigente
+    """
+    key = versioned_key(ROUTING_PREFIX, user_id)
+    routing = cache.get(key)
+    if routing is None:
+        routing = load_routing(user_id)
+        cache.set(key, routing, settings.CONTACT_ROUTING_CACHE_TTL)
+    return routing
+
+def invalidate_routing(user_id):
+    invalidate_version(ROUTING_PREFIX, user_id)
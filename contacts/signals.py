@@ -0,0 +1,14 @@
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import EmergencyContact
+from .routing import invalidate_routing
+
+@receiver(post_save, sender=EmergencyContact)
+@receiver(post_delete, sender=EmergencyContact)
+def invalidate_emergency_routing(sender, instance, **kwargs):
+    """Invalidar o cache de roteamento de alertas quando um contato de emergência muda"""
+    # Depois do commit, para que nenhuma leitura concorrente publique dados antigos na nova versão
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_routing(user_id))
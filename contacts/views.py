@@ -2,16 +2,17 @@
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import SearchFilter
+from lia_project.pagination import NameKeysetPagination
 from .models import SafeContact, EmergencyContact
 from .serializers import SafeContactSerializer, EmergencyContactSerializer
 
 class SafeContactListCreateView(generics.ListCreateAPIView):
     serializer_class = SafeContactSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    pagination_class = NameKeysetPagination
+    filter_backends = [DjangoFilterBackend, SearchFilter]
     search_fields = ['name', 'relationship']
-    ordering = ['name']
     
     def get_queryset(self):
         return SafeContact.objects.filter(user=self.request.user)
@@ -29,9 +30,9 @@ class SafeContactDetailView(generics.RetrieveUpdateDestroyAPIView):
 class EmergencyContactListCreateView(generics.ListCreateAPIView):
     serializer_class = EmergencyContactSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    pagination_class = NameKeysetPagination
+    filter_backends = [DjangoFilterBackend, SearchFilter]
     search_fields = ['name', 'relationship']
-    ordering = ['name']
     
     def get_queryset(self):
         return EmergencyContact.objects.filter(user=self.request.user)
@@ -1,6 +1,6 @@
 
 from django.contrib import admin
-from .models import DiaryEntry, DiaryAttachment
+from .models import DiaryEntry, DiaryAttachment, DiaryBlob, DiaryDailySummary, DiaryUpload
 
 @admin.register(DiaryEntry)
 class DiaryEntryAdmin(admin.ModelAdmin):
@@ -14,3 +14,23 @@ class DiaryAttachmentAdmin(admin.ModelAdmin):
     list_display = ('name', 'entry', 'file_type', 'created_at')
     list_filter = ('file_type', 'created_at')
     search_fields = ('name', 'entry__title')
+
+@admin.register(DiaryBlob)
+class DiaryBlobAdmin(admin.ModelAdmin):
+    list_display = ('sha256', 'size', 'ref_count', 'created_at')
+    search_fields = ('sha256',)
+    readonly_fields = ('sha256', 'file', 'size', 'ref_count', 'created_at')
+
+@admin.register(DiaryDailySummary)
+class DiaryDailySummaryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'date', 'entry_count', 'updated_at')
+    list_filter = ('date',)
+    search_fields = ('user__email',)
+    readonly_fields = ('updated_at',)
+
+@admin.register(DiaryUpload)
+class DiaryUploadAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'user', 'entry', 'offset', 'size', 'status', 'updated_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('filename', 'user__email')
+    readonly_fields = ('created_at', 'updated_at')
@@ -5,3 +5,6 @@ class DiaryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'diary'
     verbose_name = 'Diário'
+    
+    def ready(self):
+        import diary.signals
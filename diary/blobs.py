@@ -0,0 +1,104 @@
+
+import hashlib
+import os
+from django.core.files import File
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from .models import DiaryBlob
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+class LocalFile(File):
+    """
+    Arquivo já gravado em disco. Com temporary_file_path o FileSystemStorage
+    move o arquivo (rename) em vez de copiá-lo byte a byte
+    """
+    def temporary_file_path(self):
+        return self.file.name
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def blob_name(sha256, filename):
+    # Dois níveis de diretório evitam pastas com milhões de arquivos
+    extension = os.path.splitext(filename)[1].lower()[:10]
+    return f'diary_attachments/blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}'
+
+def _retain(blob):
+    DiaryBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+    blob.ref_count += 1
+    return blob
+
+def store(path, filename):
+    """
+    Guardar o arquivo em path e devolver o DiaryBlob com uma referência a mais.
+    Se o conteúdo já existe, só o contador muda e o arquivo local é descartado.
+    A gravação no storage acontece fora de transação; só a linha do blob é
+    criada ou atualizada dentro de uma, curta
+    """
+    sha256 = file_digest(path)
+    with transaction.atomic():
+        blob = DiaryBlob.objects.select_for_update().filter(sha256=sha256).first()
+        if blob is not None:
+            os.remove(path)
+            return _retain(blob)
+    
+    blob = DiaryBlob(sha256=sha256, size=os.path.getsize(path), ref_count=1)
+    storage = blob.file.storage
+    name = blob_name(sha256, filename)
+    if storage.exists(name):
+        # Sobra de uma tentativa anterior, ou de outro envio concorrente do mesmo conteúdo
+        os.remove(path)
+        blob.file.name = name
+    else:
+        with open(path, 'rb') as source:
+            blob.file.name = storage.save(name, LocalFile(source, name=path))
+        if os.path.exists(path):
+            os.remove(path)
+    
+    try:
+        with transaction.atomic():
+            blob.save()
+    except IntegrityError:
+        # Outro envio do mesmo conteúdo criou a linha primeiro: vira referência a ela
+        with transaction.atomic():
+            existing = DiaryBlob.objects.select_for_update().get(sha256=sha256)
+            if blob.file.name != existing.file.name:
+                storage.delete(blob.file.name)
+            return _retain(existing)
+    return blob
+
+def add_variants(blob_id, names):
+    """Registrar arquivos derivados do conteúdo (miniaturas...), apagados junto com ele"""
+    names = [name for name in names if name]
+    with transaction.atomic():
+        blob = DiaryBlob.objects.select_for_update().filter(pk=blob_id).first()
+        if blob is None:
+            return
+        new = [name for name in names if name not in blob.variants]
+        if new:
+            blob.variants = blob.variants + new
+            blob.save(update_fields=['variants'])
+
+def release(blob_id):
+    """
+    Soltar uma referência; sem nenhuma, o conteúdo e as variantes
+    registradas saem do storage após o commit
+    """
+    with transaction.atomic():
+        blob = DiaryBlob.objects.select_for_update().filter(pk=blob_id).first()
+        if blob is None:
+            return False
+        if blob.ref_count > 1:
+            DiaryBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+            return False
+        
+        names = [blob.file.name] + blob.variants
+        storage = blob.file.storage
+        blob.delete()
+        transaction.on_commit(lambda: [storage.delete(name) for name in names])
+    return True
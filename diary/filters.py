@@ -0,0 +1,22 @@
+
+from django.contrib.postgres.search import SearchQuery
+from rest_framework.filters import BaseFilterBackend
+from .models import DiaryEntry
+
+def build_search_query(terms):
+    """Consulta no formato websearch: aspas para frases, - para excluir termos"""
+    return SearchQuery(terms, config=DiaryEntry.SEARCH_CONFIG, search_type='websearch')
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Substitui o SearchFilter (ILIKE '%termo%', varredura completa) por busca
+    no tsvector indexado com GIN
+    """
+
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        terms = request.query_params.get(self.search_param, '').strip()
+        if not terms:
+            return queryset
+        return queryset.filter(search_vector=build_search_query(terms))
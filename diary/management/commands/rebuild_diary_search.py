@@ -0,0 +1,20 @@
+
+from django.core.management.base import BaseCommand
+from diary.models import DiaryEntry
+
+class Command(BaseCommand):
+    help = 'Preenche o tsvector de busca das entradas do diário (entradas antigas ou após mudar a configuração)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Recalcular todas as entradas, não só as sem índice')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        queryset = DiaryEntry.objects.all() if options['all'] else DiaryEntry.objects.filter(search_vector__isnull=True)
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+        batch_size = options['batch_size']
+        for start in range(0, len(ids), batch_size):
+            DiaryEntry.objects.filter(pk__in=ids[start:start + batch_size]).update(
+                search_vector=DiaryEntry.search_vector_expression()
+            )
+        self.stdout.write(f'{len(ids)} entradas indexadas')
@@ -0,0 +1,24 @@
+
+from django.core.management.base import BaseCommand
+from diary import summaries
+from diary.models import DiaryEntry
+
+class Command(BaseCommand):
+    help = 'Recalcula a tabela de resumos diários do diário (carga inicial ou correção)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        days = DiaryEntry.objects.order_by().values_list('user_id', 'date').distinct().iterator(chunk_size=options['batch_size'])
+        batch, total = [], 0
+        for day in days:
+            batch.append(day)
+            if len(batch) >= options['batch_size']:
+                summaries.refresh(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            summaries.refresh(batch)
+            total += len(batch)
+        self.stdout.write(f'{total} resumos recalculados')
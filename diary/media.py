@@ -0,0 +1,161 @@
+
+import io
+import os
+import tempfile
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+from . import blobs
+
+DISPLAY_MAX_SIZE = (1280, 1280)
+DISPLAY_QUALITY = 80
+THUMBNAIL_SIZE = (256, 256)
+THUMBNAIL_QUALITY = 70
+
+# Assinaturas (offset, bytes, tipo) dos formatos aceitos como anexo
+SIGNATURES = [
+    (0, b'\xff\xd8\xff', 'image/jpeg'),
+    (0, b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (0, b'GIF87a', 'image/gif'),
+    (0, b'GIF89a', 'image/gif'),
+    (0, b'%PDF-', 'application/pdf'),
+    (0, b'ID3', 'audio/mpeg'),
+    (0, b'OggS', 'audio/ogg'),
+    (0, b'\x1a\x45\xdf\xa3', 'video/webm'),
+]
+
+# Formatos cujo original é regravado sem metadados (EXIF com GPS, câmera...)
+STRIP_FORMATS = {'JPEG', 'PNG', 'WEBP'}
+
+def sniff_type(head):
+    """Tipo real do arquivo a partir dos primeiros bytes, ignorando o que o cliente declarou"""
+    for offset, magic, mime in SIGNATURES:
+        if head[offset:offset + len(magic)] == magic:
+            return mime
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+        return 'audio/wav'
+    if head[4:8] == b'ftyp':
+        brand = head[8:12]
+        if brand in (b'heic', b'heix', b'mif1'):
+            return 'image/heic'
+        if brand == b'M4A ':
+            return 'audio/mp4'
+        if brand == b'qt  ':
+            return 'video/quicktime'
+        return 'video/mp4'
+    return 'application/octet-stream'
+
+def encode(image, size, quality):
+    """Reduzir a imagem para caber em size e codificar em WebP"""
+    variant = image.copy()
+    variant.thumbnail(size, Image.LANCZOS)
+    buffer = io.BytesIO()
+    variant.save(buffer, 'WEBP', quality=quality, method=4)
+    return buffer.getvalue()
+
+def strip_metadata(image, source_format):
+    """Regravar o original sem EXIF/XMP, no mesmo formato"""
+    buffer = io.BytesIO()
+    options = {}
+    if source_format == 'JPEG':
+        options = {'quality': 95, 'optimize': True}
+    elif source_format == 'WEBP':
+        options = {'quality': 95}
+    image.save(buffer, source_format, **options)
+    return buffer.getvalue()
+
+def variant_name(attachment, suffix):
+    # Com conteúdo deduplicado, as variantes também são compartilhadas
+    key = attachment.blob.sha256 if attachment.blob_id else attachment.id
+    return f'{key}_{suffix}.webp'
+
+def reuse_processed(attachment):
+    """
+    Copiar o resultado de outro anexo com o mesmo conteúdo já processado.
+    Retorna os campos alterados, ou None se não houver nenhum
+    """
+    if not attachment.blob_id:
+        return None
+    done = (
+        type(attachment).objects
+        .filter(blob_id=attachment.blob_id, processing_status__in=['ready', 'skipped'])
+        .exclude(pk=attachment.pk)
+        .first()
+    )
+    if done is None:
+        return None
+    fields = ['file', 'file_type', 'display', 'thumbnail', 'width', 'height', 'processing_status']
+    for field in fields:
+        setattr(attachment, field, getattr(done, field))
+    return fields
+
+def replace_original(attachment, content):
+    """
+    Guardar o original sem metadados como outro conteúdo deduplicado e
+    apontar o anexo para ele. O blob antigo continua intacto para quem mais
+    o usa (e com o SHA-256 batendo com os bytes); este anexo só solta a
+    referência
+    """
+    os.makedirs(settings.DIARY_UPLOAD_TEMP_DIR, exist_ok=True)
+    descriptor, path = tempfile.mkstemp(dir=settings.DIARY_UPLOAD_TEMP_DIR, suffix='.part')
+    with os.fdopen(descriptor, 'wb') as target:
+        target.write(content)
+    
+    old_blob_id, old_name = attachment.blob_id, attachment.file.name
+    attachment.blob = blobs.store(path, old_name)
+    attachment.file.name = attachment.blob.file.name
+    attachment.save(update_fields=['blob', 'file'])
+    if old_blob_id:
+        blobs.release(old_blob_id)
+    else:
+        # Anexo anterior à deduplicação: o arquivo era só dele
+        attachment.file.storage.delete(old_name)
+
+def process(attachment):
+    """
+    Identificar o tipo real do anexo e, se for imagem: remover metadados do
+    original, gerar a variante de exibição e a miniatura (WebP). Retorna a
+    lista de campos alterados
+    """
+    reused = reuse_processed(attachment)
+    if reused is not None:
+        return reused
+    
+    with attachment.file.open('rb') as source:
+        attachment.file_type = sniff_type(source.read(32))
+        if not attachment.file_type.startswith('image/'):
+            attachment.processing_status = 'skipped'
+            return ['file_type', 'processing_status']
+        
+        source.seek(0)
+        try:
+            image = Image.open(source)
+            source_format = image.format
+            image.load()
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+            # HEIC sem plugin, arquivo corrompido ou grande demais
+            attachment.processing_status = 'failed'
+            return ['file_type', 'processing_status']
+    
+    has_metadata = bool(image.getexif()) or any(key in image.info for key in ('exif', 'xmp', 'XML:com.adobe.xmp'))
+    # Aplica a orientação do EXIF antes de descartá-lo
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+    
+    if has_metadata and source_format in STRIP_FORMATS:
+        replace_original(attachment, strip_metadata(image, source_format))
+        # Os mesmos bytes limpos podem já ter sido processados para outro anexo
+        reused = reuse_processed(attachment)
+        if reused is not None:
+            return reused
+    
+    attachment.display.save(variant_name(attachment, 'display'), ContentFile(encode(image, DISPLAY_MAX_SIZE, DISPLAY_QUALITY)), save=False)
+    attachment.thumbnail.save(variant_name(attachment, 'thumb'), ContentFile(encode(image, THUMBNAIL_SIZE, THUMBNAIL_QUALITY)), save=False)
+    if attachment.blob_id:
+        blobs.add_variants(attachment.blob_id, [attachment.display.name, attachment.thumbnail.name])
+    attachment.width, attachment.height = image.size
+    attachment.processing_status = 'ready'
+    return ['file', 'file_type', 'display', 'thumbnail', 'width', 'height', 'processing_status']
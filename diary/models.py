@@ -1,4 +1,6 @@
 
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
 from django.conf import settings
 import uuid
@@ -12,24 +14,126 @@ class DiaryEntry(models.Model):
     mood = models.CharField(max_length=50, blank=True, null=True)
     location = models.CharField(max_length=255, blank=True, null=True)
     attachments = models.JSONField(default=list, blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Configuração de texto do PostgreSQL (stemming e stopwords em português)
+    SEARCH_CONFIG = 'portuguese'
+
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Entrada do Diário'
         verbose_name_plural = 'Entradas do Diário'
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='diary_entry_user_keyset'),
+            models.Index(fields=['user', 'updated_at', 'id'], name='diary_entry_user_sync'),
+            GinIndex(fields=['search_vector'], name='diary_entry_search_gin'),
+        ]
 
     def __str__(self):
         return f"{self.title or self.content[:50]}... - {self.user.email}"
 
+    @classmethod
+    def search_vector_expression(cls):
+        """Título com peso A e conteúdo com peso B no tsvector"""
+        return (
+            SearchVector('title', weight='A', config=cls.SEARCH_CONFIG)
+            + SearchVector('content', weight='B', config=cls.SEARCH_CONFIG)
+        )
+
+class DiaryBlob(models.Model):
+    """
+    Conteúdo de anexo endereçado pelo SHA-256 do arquivo enviado. O mesmo
+    arquivo anexado a várias entradas é gravado uma vez; ref_count conta os
+    anexos que o usam
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to='diary_attachments/blobs/', max_length=255)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    # Nomes no storage das variantes (exibição, miniatura) geradas deste conteúdo
+    variants = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Conteúdo de Anexo'
+        verbose_name_plural = 'Conteúdos de Anexos'
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} refs)"
+
 class DiaryAttachment(models.Model):
+    PROCESSING_CHOICES = [
+        ('pending', 'Pendente'),
+        ('ready', 'Pronto'),
+        ('skipped', 'Sem variantes'),
+        ('failed', 'Falhou'),
+    ]
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     entry = models.ForeignKey(DiaryEntry, on_delete=models.CASCADE, related_name='attachment_files')
     name = models.CharField(max_length=255)
-    file = models.FileField(upload_to='diary_attachments/')
+    file = models.FileField(upload_to='diary_attachments/', max_length=255)
+    blob = models.ForeignKey(DiaryBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='attachments')
     file_type = models.CharField(max_length=50, blank=True)
+    processing_status = models.CharField(max_length=20, choices=PROCESSING_CHOICES, default='pending')
+    display = models.FileField(upload_to='diary_attachments/display/', blank=True, null=True)
+    thumbnail = models.FileField(upload_to='diary_attachments/thumbs/', blank=True, null=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.name} - {self.entry.title or 'Sem título'}"
+
+class DiaryDailySummary(models.Model):
+    """
+    Contagem de entradas e humores por usuário e dia, mantida a cada
+    gravação ou exclusão de entrada (ver diary/summaries.py)
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='diary_summaries')
+    date = models.DateField()
+    entry_count = models.PositiveIntegerField(default=0)
+    mood_counts = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['date']
+        verbose_name = 'Resumo Diário'
+        verbose_name_plural = 'Resumos Diários'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='diary_summary_user_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.date}: {self.entry_count}"
+
+class DiaryUpload(models.Model):
+    """Envio de anexo em partes, retomável a partir do último offset recebido"""
+
+    STATUS_CHOICES = [
+        ('uploading', 'Enviando'),
+        ('complete', 'Concluído'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='diary_uploads')
+    entry = models.ForeignKey(DiaryEntry, on_delete=models.CASCADE, related_name='uploads')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    attachment = models.OneToOneField(DiaryAttachment, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Envio de Anexo'
+        verbose_name_plural = 'Envios de Anexos'
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size}) - {self.get_status_display()}"
@@ -1,11 +1,20 @@
 
 from rest_framework import serializers
-from .models import DiaryEntry, DiaryAttachment
+from django.conf import settings
+from .models import DiaryEntry, DiaryAttachment, DiaryUpload
+
+class DiaryAttachmentPreviewSerializer(serializers.ModelSerializer):
+    """Só a miniatura, para as telas de lista"""
+    class Meta:
+        model = DiaryAttachment
+        fields = ('id', 'name', 'file_type', 'thumbnail', 'processing_status')
 
 class DiaryEntrySerializer(serializers.ModelSerializer):
+    attachment_previews = DiaryAttachmentPreviewSerializer(source='attachment_files', many=True, read_only=True)
+
     class Meta:
         model = DiaryEntry
-        fields = ('id', 'title', 'content', 'date', 'mood', 'location', 'attachments', 'created_at', 'updated_at')
+        fields = ('id', 'title', 'content', 'date', 'mood', 'location', 'attachments', 'attachment_previews', 'created_at', 'updated_at')
         read_only_fields = ('id', 'created_at', 'updated_at')
 
 class DiaryEntryCreateUpdateSerializer(serializers.ModelSerializer):
@@ -20,5 +29,35 @@ class DiaryEntryCreateUpdateSerializer(serializers.ModelSerializer):
 class DiaryAttachmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = DiaryAttachment
-        fields = ('id', 'name', 'file', 'file_type', 'created_at')
-        read_only_fields = ('id', 'created_at')
+        fields = (
+            'id', 'name', 'file', 'file_type', 'processing_status',
+            'display', 'thumbnail', 'width', 'height', 'created_at'
+        )
+        read_only_fields = ('id', 'file_type', 'processing_status', 'display', 'thumbnail', 'width', 'height', 'created_at')
+
+class DiarySearchResultSerializer(serializers.ModelSerializer):
+    rank = serializers.FloatField(read_only=True)
+    snippet = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = DiaryEntry
+        fields = ('id', 'title', 'snippet', 'rank', 'date', 'mood', 'created_at')
+
+class DiaryUploadSerializer(serializers.ModelSerializer):
+    chunk_size = serializers.SerializerMethodField()
+    attachment = DiaryAttachmentSerializer(read_only=True)
+
+    class Meta:
+        model = DiaryUpload
+        fields = ('id', 'filename', 'content_type', 'size', 'offset', 'status', 'chunk_size', 'attachment', 'created_at')
+        read_only_fields = ('id', 'offset', 'status', 'created_at')
+
+    def get_chunk_size(self, obj):
+        return settings.DIARY_UPLOAD_CHUNK_SIZE
+
+    def validate_size(self, value):
+        if value <= 0 or value > settings.DIARY_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f'O tamanho deve estar entre 1 e {settings.DIARY_UPLOAD_MAX_SIZE} bytes.'
+            )
+        return value
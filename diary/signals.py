@@ -0,0 +1,41 @@
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import DiaryEntry, DiaryAttachment
+from . import summaries
+
+@receiver(post_save, sender=DiaryEntry)
+def update_search_vector(sender, instance, update_fields=None, **kwargs):
+    """Manter o tsvector da entrada em dia quando título ou conteúdo mudam"""
+    if update_fields is not None and not {'title', 'content'} & set(update_fields):
+        return
+    DiaryEntry.objects.filter(pk=instance.pk).update(search_vector=DiaryEntry.search_vector_expression())
+
+@receiver(post_save, sender=DiaryEntry)
+@receiver(post_delete, sender=DiaryEntry)
+def update_daily_summary(sender, instance, update_fields=None, **kwargs):
+    """
+    Manter o resumo diário (entradas e humores) em dia: recalcula em toda
+    criação, exclusão e save() completo; um save() com update_fields só
+    recalcula se incluir 'mood'. bulk_create/bulk_update não passam por aqui:
+    o endpoint em lote chama summaries.schedule
+    """
+    if update_fields is not None and 'mood' not in update_fields:
+        return
+    summaries.schedule(instance.user_id, instance.date)
+
+@receiver(post_save, sender=DiaryAttachment)
+def enqueue_attachment_processing(sender, instance, created, **kwargs):
+    """Identificar o tipo, limpar metadados e gerar miniaturas em segundo plano"""
+    if not created:
+        return
+    from .tasks import process_attachment
+    transaction.on_commit(lambda: process_attachment.delay(str(instance.pk)))
+
+@receiver(post_delete, sender=DiaryAttachment)
+def release_attachment_blob(sender, instance, **kwargs):
+    """Soltar a referência ao conteúdo deduplicado do anexo removido"""
+    if instance.blob_id:
+        from .blobs import release
+        release(instance.blob_id)
@@ -0,0 +1,85 @@
+
+import threading
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from .models import DiaryEntry, DiaryDailySummary
+
+_pending = threading.local()
+
+def schedule(user_id, day):
+    """
+    Recalcular o resumo de (usuário, dia) após o commit. Vários agendamentos
+    na mesma transação (ex.: exclusão em lote) viram um recálculo por dia
+    """
+    days = getattr(_pending, 'days', None)
+    if days is None:
+        days = _pending.days = set()
+    days.add((user_id, day))
+    transaction.on_commit(flush)
+
+def flush():
+    days = getattr(_pending, 'days', None)
+    _pending.days = None
+    if days:
+        refresh(days)
+
+def refresh(days):
+    """Recontar as entradas de cada (usuário, dia) e gravar os resumos"""
+    days = set(days)
+    rows = (
+        DiaryEntry.objects
+        .filter(user_id__in={user_id for user_id, _ in days}, date__in={day for _, day in days})
+        .order_by()
+        .values_list('user_id', 'date', 'mood')
+        .annotate(total=Count('id'))
+    )
+    counts = {}
+    for user_id, day, mood, total in rows:
+        if (user_id, day) not in days:
+            continue
+        entry_count, mood_counts = counts.get((user_id, day), (0, {}))
+        if mood:
+            mood_counts[mood] = total
+        counts[(user_id, day)] = (entry_count + total, mood_counts)
+    
+    now = timezone.now()
+    if counts:
+        DiaryDailySummary.objects.bulk_create(
+            [
+                DiaryDailySummary(user_id=user_id, date=day, entry_count=entry_count, mood_counts=mood_counts, updated_at=now)
+                for (user_id, day), (entry_count, mood_counts) in counts.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['user', 'date'],
+            update_fields=['entry_count', 'mood_counts', 'updated_at']
+        )
+    for user_id, day in days - set(counts):
+        DiaryDailySummary.objects.filter(user_id=user_id, date=day).delete()
+
+def bucket_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+def aggregate(rows, bucket):
+    """Somar os resumos diários por dia, semana (segunda-feira) ou mês"""
+    buckets = {}
+    for row in rows:
+        start = bucket_start(row.date, bucket)
+        current = buckets.setdefault(start, {'start': start, 'entries': 0, 'moods': {}})
+        current['entries'] += row.entry_count
+        for mood, total in row.mood_counts.items():
+            current['moods'][mood] = current['moods'].get(mood, 0) + total
+    return [buckets[start] for start in sorted(buckets)]
+
+def totals(buckets):
+    result = {'entries': 0, 'moods': {}}
+    for current in buckets:
+        result['entries'] += current['entries']
+        for mood, total in current['moods'].items():
+            result['moods'][mood] = result['moods'].get(mood, 0) + total
+    return result
@@ -0,0 +1,23 @@
+
+import logging
+from celery import shared_task
+from .models import DiaryAttachment
+from . import media
+
+logger = logging.getLogger(__name__)
+
+@shared_task(acks_late=True)
+def process_attachment(attachment_id):
+    """Processar um anexo recém-criado fora da requisição (fila 'bulk')"""
+    attachment = DiaryAttachment.objects.filter(pk=attachment_id).first()
+    if attachment is None or attachment.processing_status != 'pending':
+        return
+    
+    try:
+        update_fields = media.process(attachment)
+    except Exception:
+        logger.exception('Falha ao processar o anexo %s', attachment_id)
+        attachment.processing_status = 'failed'
+        update_fields = ['processing_status']
+    attachment.save(update_fields=update_fields)
+    return attachment.processing_status
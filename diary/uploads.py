@@ -0,0 +1,87 @@
+
+import os
+from django.conf import settings
+from .models import DiaryAttachment
+from . import blobs
+
+READ_BLOCK_SIZE = 64 * 1024
+
+class UploadOffsetError(Exception):
+    """O offset enviado pelo cliente não corresponde ao já recebido"""
+
+class UploadInProgress(Exception):
+    """Outra requisição já tomou o arquivo parcial para concluir o envio"""
+
+def part_path(upload):
+    return os.path.join(settings.DIARY_UPLOAD_TEMP_DIR, f'{upload.id}.part')
+
+def claim_path(upload):
+    return os.path.join(settings.DIARY_UPLOAD_TEMP_DIR, f'{upload.id}.complete')
+
+def start(upload):
+    """Criar o arquivo parcial vazio de um novo envio"""
+    os.makedirs(settings.DIARY_UPLOAD_TEMP_DIR, exist_ok=True)
+    open(part_path(upload), 'wb').close()
+
+def write_chunk(upload, offset, stream, length):
+    """
+    Copiar até length bytes do corpo da requisição para o arquivo parcial, a
+    partir de offset, em blocos de 64 KB. Retorna o novo offset; se a conexão
+    cair no meio, o que já foi gravado continua valendo para a retomada
+    """
+    if offset != upload.offset:
+        raise UploadOffsetError(upload.offset)
+
+    written = 0
+    with open(part_path(upload), 'r+b') as part:
+        part.seek(offset)
+        try:
+            while written < length:
+                block = stream.read(min(READ_BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                part.write(block)
+                written += len(block)
+        finally:
+            part.truncate(offset + written)
+    return offset + written
+
+def store(upload):
+    """
+    Guardar o arquivo completo no storage deduplicado, fora de transação. O
+    rename do arquivo parcial é atômico: só uma requisição o toma, as outras
+    recebem UploadInProgress. Se o storage falhar, o arquivo volta a ser parcial
+    """
+    path = claim_path(upload)
+    try:
+        os.rename(part_path(upload), path)
+    except FileNotFoundError:
+        raise UploadInProgress(upload.id)
+    
+    try:
+        return blobs.store(path, upload.filename)
+    except Exception:
+        if os.path.exists(path):
+            os.rename(path, part_path(upload))
+        raise
+
+def finish(upload, blob):
+    """
+    Criar o DiaryAttachment apontando para o blob já guardado. Chamado com o
+    envio travado, só grava metadados; conteúdo repetido vira só uma
+    referência a mais no DiaryBlob existente
+    """
+    return DiaryAttachment.objects.create(
+        entry=upload.entry,
+        name=upload.filename,
+        file=blob.file.name,
+        blob=blob,
+        file_type=upload.content_type
+    )
+
+def discard(upload):
+    for path in (part_path(upload), claim_path(upload)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -4,5 +4,11 @@ from . import views
 
 urlpatterns = [
     path('', views.DiaryEntryListCreateView.as_view(), name='diary-list-create'),
+    path('bulk/', views.DiaryEntryBulkView.as_view(), name='diary-bulk'),
+    path('analytics/', views.DiaryAnalyticsView.as_view(), name='diary-analytics'),
+    path('search/', views.DiaryEntrySearchView.as_view(), name='diary-search'),
     path('<uuid:pk>/', views.DiaryEntryDetailView.as_view(), name='diary-detail'),
+    path('<uuid:pk>/uploads/', views.DiaryUploadCreateView.as_view(), name='diary-upload-create'),
+    path('uploads/<uuid:upload_id>/', views.DiaryUploadView.as_view(), name='diary-upload'),
+    path('uploads/<uuid:upload_id>/complete/', views.DiaryUploadCompleteView.as_view(), name='diary-upload-complete'),
 ]
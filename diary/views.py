@@ -2,21 +2,52 @@
 from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
-from .models import DiaryEntry
-from .serializers import DiaryEntrySerializer, DiaryEntryCreateUpdateSerializer
+from rest_framework.utils.encoders import JSONEncoder
+from django.http import StreamingHttpResponse
+from django.contrib.postgres.search import SearchHeadline, SearchRank
+from django.db.models import F, prefetch_related_objects
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import timedelta
+from lia_project.pagination import KeysetPagination
+from .filters import FullTextSearchFilter, build_search_query
+from django.conf import settings
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from . import blobs, summaries, uploads
+from .models import DiaryEntry, DiaryDailySummary, DiaryUpload
+from .serializers import (
+    DiaryEntrySerializer,
+    DiaryEntryCreateUpdateSerializer,
+    DiarySearchResultSerializer,
+    DiaryUploadSerializer
+)
+import uuid
+
+class DiaryKeysetPagination(KeysetPagination):
+    # Mantém o envelope {'entries': [...]} usado pelos clientes existentes
+    results_key = 'entries'
+    page_size = 50
+    max_page_size = 200
 
 class DiaryEntryListCreateView(generics.ListCreateAPIView):
+    """
+    Lista as entradas do usuário com filtros (?mood=, ?date=, ?search=) em
+    páginas keyset: {'entries': [...], 'next': ..., 'previous': ...}.
+    
+    ?stream=ndjson devolve todas as entradas filtradas, uma por linha, lidas
+    de um cursor do lado do servidor; a memória fica constante.
+    """
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    pagination_class = DiaryKeysetPagination
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
     filterset_fields = ['mood', 'date']
-    search_fields = ['title', 'content']
-    ordering_fields = ['created_at', 'date']
-    ordering = ['-created_at']
+    stream_chunk_size = 500
     
     def get_queryset(self):
-        return DiaryEntry.objects.filter(user=self.request.user)
+        return DiaryEntry.objects.filter(user=self.request.user).prefetch_related('attachment_files')
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -24,11 +55,24 @@ class DiaryEntryListCreateView(generics.ListCreateAPIView):
         return DiaryEntrySerializer
     
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = DiaryEntrySerializer(queryset, many=True, context={'request': request})
-        return Response({
-            'entries': serializer.data
-        })
+        queryset = self.filter_queryset(self.get_queryset())
+        
+        if request.query_params.get('stream') == 'ndjson':
+            return self.stream_ndjson(queryset)
+        
+        page = self.paginate_queryset(queryset)
+        serializer = DiaryEntrySerializer(page, many=True, context={'request': request})
+        return self.get_paginated_response(serializer.data)
+    
+    def stream_ndjson(self, queryset):
+        context = self.get_serializer_context()
+        encoder = JSONEncoder(ensure_ascii=False)
+        
+        def rows():
+            for entry in queryset.order_by('-created_at', '-id').iterator(chunk_size=self.stream_chunk_size):
+                yield encoder.encode(DiaryEntrySerializer(entry, context=context).data) + '\n'
+        
+        return StreamingHttpResponse(rows(), content_type='application/x-ndjson')
     
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -44,7 +88,7 @@ class DiaryEntryDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return DiaryEntry.objects.filter(user=self.request.user)
+        return DiaryEntry.objects.filter(user=self.request.user).prefetch_related('attachment_files')
     
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
@@ -68,3 +112,323 @@ class DiaryEntryDetailView(generics.RetrieveUpdateDestroyAPIView):
         instance = self.get_object()
         self.perform_destroy(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+class DiaryEntryBulkView(APIView):
+    """
+    Reenvio em lote das operações feitas offline, em uma transação:
+    {"create": [{...}], "update": [{"id": ..., ...}], "delete": [id, ...]}.
+    
+    Cada item é validado como no endpoint individual; itens inválidos voltam
+    com os erros e não impedem os demais. Um create com "id" de uma entrada
+    que já existe é tratado como reenvio e devolve a entrada atual.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        payload = request.data if isinstance(request.data, dict) else {}
+        operations = {key: payload.get(key) or [] for key in ('create', 'update', 'delete')}
+        if not all(isinstance(items, list) for items in operations.values()):
+            return Response({'error': 'create, update e delete devem ser listas'}, status=status.HTTP_400_BAD_REQUEST)
+        if sum(len(items) for items in operations.values()) > settings.DIARY_BULK_MAX_ITEMS:
+            return Response(
+                {'error': f'Máximo de {settings.DIARY_BULK_MAX_ITEMS} itens por requisição'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        with transaction.atomic():
+            created, created_results = self.bulk_create(request, operations['create'])
+            updated, updated_results = self.bulk_update(request, operations['update'])
+            deleted_results = self.bulk_delete(request, operations['delete'])
+            
+            # bulk_create/bulk_update não disparam o post_save que indexa a
+            # busca e atualiza o resumo diário
+            changed = [entry.pk for entry in created + updated]
+            if changed:
+                DiaryEntry.objects.filter(pk__in=changed).update(search_vector=DiaryEntry.search_vector_expression())
+            for entry in created + updated:
+                summaries.schedule(entry.user_id, entry.date)
+        
+        context = {'request': request}
+        prefetch_related_objects(created + updated, 'attachment_files')
+        for result in created_results + updated_results:
+            if 'entry' in result:
+                result['entry'] = DiaryEntrySerializer(result['entry'], context=context).data
+        
+        return Response({
+            'created': created_results,
+            'updated': updated_results,
+            'deleted': deleted_results,
+        })
+    
+    def bulk_create(self, request, items):
+        client_ids = {}
+        for index, item in enumerate(items):
+            try:
+                client_ids[index] = uuid.UUID(str(item['id'])) if isinstance(item, dict) and item.get('id') else None
+            except ValueError:
+                client_ids[index] = None
+        existing = DiaryEntry.objects.in_bulk([pk for pk in client_ids.values() if pk])
+        
+        entries, results, seen = [], [], set()
+        for index, item in enumerate(items):
+            pk = client_ids[index]
+            if pk in existing or pk in seen:
+                entry = existing.get(pk)
+                if entry is None or entry.user_id != request.user.id:
+                    results.append({'index': index, 'status': status.HTTP_409_CONFLICT, 'errors': {'id': ['Id já utilizado.']}})
+                else:
+                    results.append({'index': index, 'status': status.HTTP_200_OK, 'entry': entry})
+                continue
+            
+            serializer = DiaryEntryCreateUpdateSerializer(data=item, context={'request': request})
+            if not serializer.is_valid():
+                results.append({'index': index, 'status': status.HTTP_400_BAD_REQUEST, 'errors': serializer.errors})
+                continue
+            entry = DiaryEntry(user=request.user, **serializer.validated_data)
+            if pk:
+                entry.pk = pk
+                seen.add(pk)
+            entries.append(entry)
+            results.append({'index': index, 'status': status.HTTP_201_CREATED, 'entry': entry})
+        
+        DiaryEntry.objects.bulk_create(entries)
+        return entries, results
+    
+    def bulk_update(self, request, items):
+        ids = {}
+        for index, item in enumerate(items):
+            try:
+                ids[index] = uuid.UUID(str(item['id']))
+            except (TypeError, KeyError, ValueError):
+                ids[index] = None
+        entries = DiaryEntry.objects.filter(user=request.user).in_bulk([pk for pk in ids.values() if pk])
+        
+        changed, fields, results = {}, {'updated_at'}, []
+        for index, item in enumerate(items):
+            entry = entries.get(ids[index])
+            if entry is None:
+                results.append({'index': index, 'status': status.HTTP_404_NOT_FOUND, 'errors': {'id': ['Entrada não encontrada.']}})
+                continue
+            
+            serializer = DiaryEntryCreateUpdateSerializer(entry, data=item, partial=True, context={'request': request})
+            if not serializer.is_valid():
+                results.append({'index': index, 'status': status.HTTP_400_BAD_REQUEST, 'errors': serializer.errors})
+                continue
+            for field, value in serializer.validated_data.items():
+                setattr(entry, field, value)
+                fields.add(field)
+            # bulk_update não aplica o auto_now
+            entry.updated_at = timezone.now()
+            changed[entry.pk] = entry
+            results.append({'index': index, 'status': status.HTTP_200_OK, 'entry': entry})
+        
+        if changed:
+            DiaryEntry.objects.bulk_update(list(changed.values()), sorted(fields))
+        return list(changed.values()), results
+    
+    def bulk_delete(self, request, items):
+        ids = []
+        for item in items:
+            try:
+                ids.append(uuid.UUID(str(item)))
+            except ValueError:
+                ids.append(None)
+        existing = set(
+            DiaryEntry.objects.filter(user=request.user, pk__in=[pk for pk in ids if pk]).values_list('pk', flat=True)
+        )
+        if existing:
+            DiaryEntry.objects.filter(pk__in=existing).delete()
+        return [
+            {'id': item, 'status': status.HTTP_204_NO_CONTENT if pk in existing else status.HTTP_404_NOT_FOUND}
+            for item, pk in zip(items, ids)
+        ]
+
+class DiaryEntrySearchView(generics.ListAPIView):
+    """
+    Busca textual ranqueada nas entradas do usuário (?q=), com trechos
+    destacados em <mark>. Usa o tsvector em português e o índice GIN.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = DiarySearchResultSerializer
+    pagination_class = None
+    default_limit = 20
+    max_limit = 50
+    
+    def get_limit(self):
+        try:
+            limit = int(self.request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            return self.default_limit
+        return max(1, min(limit, self.max_limit))
+    
+    def get_queryset(self):
+        terms = self.request.query_params.get('q', '').strip()
+        if not terms:
+            return DiaryEntry.objects.none()
+        
+        query = build_search_query(terms)
+        rank = SearchRank(F('search_vector'), query)
+        top_ids = (
+            DiaryEntry.objects.filter(user=self.request.user, search_vector=query)
+            .annotate(rank=rank)
+            .order_by('-rank', '-created_at')
+            .values('pk')[:self.get_limit()]
+        )
+        # O ts_headline é caro: só é calculado para as entradas já selecionadas
+        return (
+            DiaryEntry.objects.filter(pk__in=top_ids)
+            .annotate(
+                rank=rank,
+                snippet=SearchHeadline(
+                    'content', query,
+                    config=DiaryEntry.SEARCH_CONFIG,
+                    start_sel='<mark>', stop_sel='</mark>',
+                    max_fragments=2, max_words=25, min_words=10,
+                ),
+            )
+            .order_by('-rank', '-created_at')
+            .only('id', 'title', 'date', 'mood', 'created_at')
+        )
+    
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer(self.get_queryset(), many=True)
+        return Response({
+            'entries': serializer.data
+        })
+
+class DiaryAnalyticsView(APIView):
+    """
+    Entradas e humores por dia, semana ou mês (?bucket=day|week|month) entre
+    ?start= e ?end= (AAAA-MM-DD; padrão: últimos 365 dias). Lê a tabela de
+    resumos diários, então um ano custa no máximo 365 linhas
+    """
+    permission_classes = [IsAuthenticated]
+    buckets = ('day', 'week', 'month')
+    
+    def get(self, request):
+        bucket = request.query_params.get('bucket', 'week')
+        if bucket not in self.buckets:
+            return Response({'error': 'bucket deve ser day, week ou month'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        today = timezone.localdate()
+        try:
+            end = parse_date(request.query_params.get('end', '')) or today
+            start = parse_date(request.query_params.get('start', '')) or end - timedelta(days=364)
+        except ValueError:
+            start = end = None
+        if start is None or end is None or start > end:
+            return Response({'error': 'Período inválido'}, status=status.HTTP_400_BAD_REQUEST)
+        if (end - start).days > settings.DIARY_ANALYTICS_MAX_DAYS:
+            return Response(
+                {'error': f'Período máximo de {settings.DIARY_ANALYTICS_MAX_DAYS} dias'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        rows = DiaryDailySummary.objects.filter(user=request.user, date__range=(start, end)).only(
+            'date', 'entry_count', 'mood_counts'
+        )
+        results = summaries.aggregate(rows, bucket)
+        return Response({
+            'start': start,
+            'end': end,
+            'bucket': bucket,
+            'results': results,
+            'totals': summaries.totals(results),
+        })
+
+class DiaryUploadCreateView(generics.CreateAPIView):
+    """
+    Iniciar o envio retomável de um anexo: {filename, content_type, size}.
+    Depois, PUT das partes em /api/diary/uploads/<id>/ com o header
+    Upload-Offset e POST em /api/diary/uploads/<id>/complete/.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = DiaryUploadSerializer
+    
+    def perform_create(self, serializer):
+        entry = get_object_or_404(DiaryEntry, pk=self.kwargs['pk'], user=self.request.user)
+        upload = serializer.save(user=self.request.user, entry=entry)
+        uploads.start(upload)
+
+class DiaryUploadView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get_upload(self, request, upload_id):
+        return get_object_or_404(DiaryUpload, pk=upload_id, user=request.user)
+    
+    def get(self, request, upload_id):
+        """Offset já recebido, para o cliente retomar de onde parou"""
+        upload = self.get_upload(request, upload_id)
+        return Response(DiaryUploadSerializer(upload, context={'request': request}).data)
+    
+    def put(self, request, upload_id):
+        """Gravar uma parte do arquivo; o corpo é o conteúdo bruto da parte"""
+        upload = self.get_upload(request, upload_id)
+        if upload.status != 'uploading':
+            return Response({'error': 'Envio já concluído'}, status=status.HTTP_409_CONFLICT)
+        
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers.get('Content-Length') or 0)
+        except (KeyError, ValueError):
+            return Response({'error': 'Headers Upload-Offset e Content-Length são obrigatórios'}, status=status.HTTP_400_BAD_REQUEST)
+        if length <= 0 or length > settings.DIARY_UPLOAD_CHUNK_SIZE or offset + length > upload.size:
+            return Response({'error': 'Tamanho da parte inválido'}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        
+        try:
+            new_offset = uploads.write_chunk(upload, offset, request.stream, length)
+        except uploads.UploadOffsetError:
+            return Response({'error': 'Offset divergente', 'offset': upload.offset}, status=status.HTTP_409_CONFLICT)
+        
+        # Atualização condicional: se outra requisição avançou o offset antes, esta perde
+        updated = DiaryUpload.objects.filter(pk=upload.pk, offset=offset).update(offset=new_offset)
+        if not updated:
+            upload.refresh_from_db(fields=['offset'])
+            return Response({'error': 'Offset divergente', 'offset': upload.offset}, status=status.HTTP_409_CONFLICT)
+        
+        return Response({'offset': new_offset, 'size': upload.size}, headers={'Upload-Offset': str(new_offset)})
+    
+    def delete(self, request, upload_id):
+        upload = self.get_upload(request, upload_id)
+        if upload.status == 'uploading':
+            uploads.discard(upload)
+        upload.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class DiaryUploadCompleteView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request, upload_id):
+        """
+        Concluir o envio e anexar o arquivo à entrada. A cópia para o storage
+        acontece antes de travar o envio; a transação só grava os metadados
+        """
+        upload = get_object_or_404(DiaryUpload.objects.select_related('entry'), pk=upload_id, user=request.user)
+        if upload.status == 'uploading':
+            if upload.offset != upload.size:
+                return Response(
+                    {'error': 'Envio incompleto', 'offset': upload.offset, 'size': upload.size},
+                    status=status.HTTP_409_CONFLICT
+                )
+            try:
+                blob = uploads.store(upload)
+            except uploads.UploadInProgress:
+                blob = None
+            
+            with transaction.atomic():
+                upload = get_object_or_404(
+                    DiaryUpload.objects.select_for_update().select_related('entry'),
+                    pk=upload_id, user=request.user
+                )
+                if upload.status == 'uploading' and blob is not None:
+                    upload.attachment = uploads.finish(upload, blob)
+                    upload.status = 'complete'
+                    upload.save(update_fields=['attachment', 'status', 'updated_at'])
+                elif blob is not None:
+                    # Outra requisição concluiu primeiro: solta a referência extra
+                    blobs.release(blob.id)
+            
+            if upload.status == 'uploading':
+                return Response({'error': 'Envio em conclusão, tente novamente'}, status=status.HTTP_409_CONFLICT)
+        
+        return Response(DiaryUploadSerializer(upload, context={'request': request}).data, status=status.HTTP_201_CREATED)
@@ -11,10 +11,23 @@ class DiaryAttachmentSerializer(serializers.ModelSerializer):
     
     def get_url(self, obj):
         if obj.file:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.file.url)
+            url = obj.file.url
+            if url.startswith(('http://', 'https://')):
+                return url
+            prefix = self.get_url_prefix()
+            if prefix is not None:
+                return prefix + url
         return None
+    
+    def get_url_prefix(self):
+        """
+        Esquema + host da requisição, calculado uma vez e guardado no contexto
+        (compartilhado por todos os anexos da listagem)
+        """
+        if '_url_prefix' not in self.context:
+            request = self.context.get('request')
+            self.context['_url_prefix'] = request.build_absolute_uri('/')[:-1] if request else None
+        return self.context['_url_prefix']
 
 class DiaryEntrySerializer(serializers.ModelSerializer):
     attachment_files = DiaryAttachmentSerializer(many=True, read_only=True)
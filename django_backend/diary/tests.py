@@ -0,0 +1,57 @@
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+from accounts.models import User
+from .models import DiaryEntry, DiaryAttachment
+
+class DiaryQueryCountTests(TestCase):
+    """
+    Listagem e detalhe do diário com número fixo de consultas: uma para as
+    entradas e uma para os anexos, não importa quantos existam
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='diario@example.com', email='diario@example.com', password='x', name='Diário'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_entries(self, entries, attachments):
+        created = []
+        for index in range(entries):
+            entry = DiaryEntry.objects.create(user=self.user, content=f'Entrada {index}')
+            DiaryAttachment.objects.bulk_create([
+                DiaryAttachment(entry=entry, name=f'foto{number}.jpg', file=f'diary_attachments/foto{number}.jpg', file_type='image/jpeg')
+                for number in range(attachments)
+            ])
+            created.append(entry)
+        return created
+
+    def test_list_query_count_is_constant(self):
+        for entries, attachments in ((1, 0), (2, 1), (10, 3), (25, 5)):
+            with self.subTest(entries=entries, attachments=attachments):
+                DiaryEntry.objects.all().delete()
+                self.create_entries(entries, attachments)
+                with self.assertNumQueries(2):
+                    response = self.client.get('/api/diary/')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['entries']), entries)
+                for entry in response.data['entries']:
+                    self.assertEqual(len(entry['attachment_files']), attachments)
+
+    def test_detail_query_count_is_constant(self):
+        for attachments in (0, 1, 5, 20):
+            with self.subTest(attachments=attachments):
+                entry, = self.create_entries(1, attachments)
+                with self.assertNumQueries(2):
+                    response = self.client.get(f'/api/diary/{entry.pk}/')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['attachment_files']), attachments)
+
+    def test_attachment_urls_are_absolute(self):
+        self.create_entries(2, 2)
+        response = self.client.get('/api/diary/')
+        for entry in response.data['entries']:
+            for attachment in entry['attachment_files']:
+                self.assertTrue(attachment['url'].startswith('http://testserver/'))
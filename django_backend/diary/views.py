@@ -16,7 +16,8 @@ class DiaryEntryListCreateView(generics.ListCreateAPIView):
     ordering = ['-created_at']
     
     def get_queryset(self):
-        return DiaryEntry.objects.filter(user=self.request.user)
+        # Uma consulta para os anexos de todas as entradas, em vez de uma por entrada
+        return DiaryEntry.objects.filter(user=self.request.user).prefetch_related('attachment_files')
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -44,7 +45,8 @@ class DiaryEntryDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return DiaryEntry.objects.filter(user=self.request.user)
+        # Uma consulta para os anexos de todas as entradas, em vez de uma por entrada
+        return DiaryEntry.objects.filter(user=self.request.user).prefetch_related('attachment_files')
     
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
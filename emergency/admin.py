@@ -1,6 +1,11 @@
 
 from django.contrib import admin
-from .models import EmergencyAlert
+from .models import EmergencyAlert, EmergencyAlertDelivery
+
+class EmergencyAlertDeliveryInline(admin.TabularInline):
+    model = EmergencyAlertDelivery
+    extra = 0
+    readonly_fields = ('contact', 'channel', 'status', 'attempts', 'last_error', 'next_attempt_at', 'sent_at')
 
 @admin.register(EmergencyAlert)
 class EmergencyAlertAdmin(admin.ModelAdmin):
@@ -8,7 +13,15 @@ class EmergencyAlertAdmin(admin.ModelAdmin):
     list_filter = ('status', 'created_at')
     search_fields = ('user__email', 'message', 'location')
     readonly_fields = ('created_at', 'updated_at')
+    inlines = [EmergencyAlertDeliveryInline]
     
     def message_preview(self, obj):
         return obj.message[:50] + "..." if obj.message and len(obj.message) > 50 else obj.message or "Sem mensagem"
     message_preview.short_description = 'Preview da Mensagem'
+
+@admin.register(EmergencyAlertDelivery)
+class EmergencyAlertDeliveryAdmin(admin.ModelAdmin):
+    list_display = ('alert', 'contact', 'channel', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status', 'channel', 'created_at')
+    search_fields = ('alert__user__email', 'contact__name')
+    readonly_fields = ('created_at', 'updated_at')
@@ -0,0 +1,42 @@
+
+import hashlib
+import json
+from django.conf import settings
+from lia_project.cache import cache
+
+def _cache_key(user, key):
+    return f'idempotency:emergency-alert:{user.pk}:{key}'
+
+def fingerprint(data):
+    """Hash estável do corpo da requisição para detectar reuso da chave com outro conteúdo"""
+    payload = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def lookup(user, key):
+    """Resposta já registrada para esta chave, ou None"""
+    return cache.get(_cache_key(user, key))
+
+class KeyInUse(Exception):
+    """A chave mudou de dono repetidamente durante a reserva (expirou ou foi liberada no meio)"""
+
+def reserve(user, key, request_fingerprint, body, attempts=3):
+    """
+    Registrar atomicamente a resposta de uma chave nova (SET NX no Redis).
+    Retorna None quando esta requisição ganhou a chave, ou o registro
+    existente quando outra requisição concorrente chegou antes.
+    
+    Se o registro do vencedor sumiu entre o SET NX e a leitura (expirou,
+    foi despejado ou liberado após erro), tenta reservar de novo; depois de
+    attempts tentativas levanta KeyInUse
+    """
+    record = {'fingerprint': request_fingerprint, 'body': body}
+    for _ in range(attempts):
+        if cache.add(_cache_key(user, key), record, settings.IDEMPOTENCY_KEY_TTL):
+            return None
+        existing = lookup(user, key)
+        if existing is not None:
+            return existing
+    raise KeyInUse(key)
+
+def release(user, key):
+    cache.delete(_cache_key(user, key))
@@ -0,0 +1,71 @@
+
+import uuid
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from contacts.models import EmergencyContact
+from emergency.models import EmergencyAlert, EmergencyAlertDelivery
+
+# Situação de cada entrega conforme o status que o alerta antigo registrou.
+# Nada volta como 'pending': a varredura reenviaria alertas antigos
+DELIVERY_STATUS = {
+    'sent': 'sent',
+    'delivered': 'sent',
+    'failed': 'failed',
+    'pending': 'failed',
+}
+
+def parse_ids(values):
+    ids = []
+    for value in values:
+        try:
+            ids.append(uuid.UUID(str(value)))
+        except ValueError:
+            pass
+    return ids
+
+class Command(BaseCommand):
+    help = 'Cria as entregas (EmergencyAlertDelivery) dos alertas antigos a partir da lista contacts_notified'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        alerts = (
+            EmergencyAlert.objects.filter(deliveries__isnull=True)
+            .exclude(legacy_contacts_notified=[])
+            .only('id', 'user_id', 'status', 'legacy_contacts_notified', 'updated_at')
+            .order_by('id')
+        )
+        created = skipped = 0
+        last_id = None
+        while True:
+            page = alerts if last_id is None else alerts.filter(id__gt=last_id)
+            batch = list(page[:options['batch_size']])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            
+            wanted = {contact_id for alert in batch for contact_id in parse_ids(alert.legacy_contacts_notified)}
+            owners = dict(EmergencyContact.objects.filter(id__in=wanted).values_list('id', 'user_id'))
+            deliveries = []
+            for alert in batch:
+                status = DELIVERY_STATUS.get(alert.status, 'failed')
+                for contact_id in parse_ids(alert.legacy_contacts_notified):
+                    # Contatos já apagados (ou de outro usuário) não têm como ser ligados
+                    if owners.get(contact_id) != alert.user_id:
+                        skipped += 1
+                        continue
+                    deliveries.append(EmergencyAlertDelivery(
+                        alert_id=alert.id,
+                        contact_id=contact_id,
+                        status=status,
+                        attempts=1,
+                        sent_at=alert.updated_at if status == 'sent' else None,
+                        last_error='' if status == 'sent' else 'Migrado do histórico sem confirmação de envio',
+                        next_attempt_at=alert.updated_at,
+                    ))
+            with transaction.atomic():
+                EmergencyAlertDelivery.objects.bulk_create(deliveries)
+            created += len(deliveries)
+        
+        self.stdout.write(f'{created} entregas criadas; {skipped} contatos antigos sem correspondência')
@@ -0,0 +1,110 @@
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection, transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+from accounts.models import User
+from contacts.models import EmergencyContact
+from emergency import outbox
+from emergency.models import AlertOutbox, EmergencyAlert, EmergencyAlertDelivery
+from emergency.tasks import build_routing, dispatch_emergency_alert
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0
+
+class Command(BaseCommand):
+    help = (
+        'Cria alertas concorrentes pelo outbox, drena com o relay e mede vazão e '
+        'latência commit→publicação e commit→entrega. Use com Postgres e Redis locais '
+        'e os workers do Celery rodando (ou CELERY_TASK_ALWAYS_EAGER)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alerts', type=int, default=1000)
+        parser.add_argument('--contacts', type=int, default=3)
+        parser.add_argument('--producers', type=int, default=8)
+        parser.add_argument('--relays', type=int, default=2)
+        parser.add_argument('--timeout', type=float, default=120)
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(
+            username=f'bench-{uuid.uuid4()}', email=f'bench-{uuid.uuid4()}@example.com', name='Bench'
+        )
+        contacts = [
+            EmergencyContact.objects.create(user=user, name=f'Contato {index}', telegram_id=str(index))
+            for index in range(options['contacts'])
+        ]
+        try:
+            with override_settings(OUTBOX_EAGER_RELAY=False):
+                self._run(user, contacts, options)
+        finally:
+            user.delete()
+
+    def _run(self, user, contacts, options):
+        stop = threading.Event()
+        relay_lags, relay_lock = [], threading.Lock()
+
+        def relay_loop():
+            while not stop.is_set():
+                published, lags = outbox.relay()
+                with relay_lock:
+                    relay_lags.extend(lags)
+                if not published:
+                    time.sleep(0.01)
+            close_old_connections()
+            connection.close()
+
+        def produce(_):
+            with transaction.atomic():
+                alert = EmergencyAlert.objects.create(user=user, message='Benchmark do outbox')
+                EmergencyAlertDelivery.objects.bulk_create([
+                    EmergencyAlertDelivery(alert=alert, contact=contact) for contact in contacts
+                ])
+                routing = build_routing(EmergencyAlertDelivery.objects.filter(alert=alert))
+                outbox.enqueue(alert.id, dispatch_emergency_alert.name, [str(alert.id), routing])
+            connection.close()
+
+        relays = [threading.Thread(target=relay_loop, daemon=True) for _ in range(options['relays'])]
+        for thread in relays:
+            thread.start()
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['producers']) as executor:
+            list(executor.map(produce, range(options['alerts'])))
+        produced = time.monotonic() - started
+
+        deadline = time.monotonic() + options['timeout']
+        while AlertOutbox.objects.filter(alert__user=user).exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        drained = time.monotonic() - started
+        stop.set()
+        for thread in relays:
+            thread.join()
+
+        expected = options['alerts'] * len(contacts)
+        sent = EmergencyAlertDelivery.objects.filter(alert__user=user, status='sent')
+        while sent.count() < expected and time.monotonic() < deadline:
+            time.sleep(0.2)
+        delivery_latencies = [
+            (sent_at - created_at).total_seconds()
+            for sent_at, created_at in sent.values_list('sent_at', 'alert__created_at')
+        ]
+
+        self.stdout.write(
+            f"{options['alerts']} alertas em {produced:.2f}s ({options['alerts'] / produced:.0f}/s); "
+            f"outbox drenado em {drained:.2f}s"
+        )
+        self.stdout.write(
+            f"commit→publicação: p50 {_percentile(relay_lags, 0.5) * 1000:.1f} ms, "
+            f"p99 {_percentile(relay_lags, 0.99) * 1000:.1f} ms"
+        )
+        self.stdout.write(
+            f"commit→entrega: {len(delivery_latencies)}/{expected} entregues, "
+            f"p50 {_percentile(delivery_latencies, 0.5) * 1000:.1f} ms, "
+            f"p99 {_percentile(delivery_latencies, 0.99) * 1000:.1f} ms"
+        )
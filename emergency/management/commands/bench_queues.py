@@ -0,0 +1,39 @@
+
+import time
+from django.core.management.base import BaseCommand
+from lia_project.celery import bulk_load_task
+from emergency.tasks import latency_probe
+
+class Command(BaseCommand):
+    help = (
+        'Satura a fila bulk e mede a latência de tarefas da fila emergency. '
+        'Requer os workers do docker-compose (celery-emergency e celery) rodando'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bulk', type=int, default=2000, help='Tarefas de carga enfileiradas em bulk')
+        parser.add_argument('--bulk-seconds', type=float, default=0.5, help='Duração de cada tarefa de carga')
+        parser.add_argument('--probes', type=int, default=50)
+        parser.add_argument('--interval', type=float, default=0.1, help='Intervalo entre probes (s)')
+        parser.add_argument(
+            '--probe-queue', default='emergency',
+            help="Fila das probes; use 'bulk' para comparar com uma fila única"
+        )
+
+    def handle(self, *args, **options):
+        for _ in range(options['bulk']):
+            bulk_load_task.delay(options['bulk_seconds'])
+        self.stdout.write(f"{options['bulk']} tarefas de carga enfileiradas em bulk")
+
+        results = []
+        for _ in range(options['probes']):
+            results.append(latency_probe.apply_async((time.time(),), queue=options['probe_queue']))
+            time.sleep(options['interval'])
+
+        latencies = sorted(result.get(timeout=600) * 1000 for result in results)
+        p50 = latencies[len(latencies) // 2]
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            f"Fila {options['probe_queue']}: {len(latencies)} probes, "
+            f"p50 {p50:.1f} ms, p99 {p99:.1f} ms, máx {latencies[-1]:.1f} ms"
+        )
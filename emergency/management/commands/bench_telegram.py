@@ -0,0 +1,42 @@
+
+import time
+from django.core.management.base import BaseCommand
+from emergency.telegram import TelegramClient
+from emergency.telegram_mock import MockTelegramServer
+
+class Command(BaseCommand):
+    help = 'Mede vazão (mensagens/s) e latência p99 do envio para o Telegram contra um servidor mock local'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=2000)
+        parser.add_argument('--chats', type=int, default=500)
+        parser.add_argument('--pool-size', type=int, default=16)
+        parser.add_argument('--bot-rate', type=float, default=1000)
+        parser.add_argument('--latency-ms', type=float, default=20)
+
+    def handle(self, *args, **options):
+        with MockTelegramServer(latency=options['latency_ms'] / 1000) as server:
+            client = TelegramClient(
+                token='bench',
+                api_url=server.url,
+                pool_size=options['pool_size'],
+                bot_rate=options['bot_rate'],
+                chat_rate=1,
+                chat_burst=options['messages'],
+                max_wait=60,
+            )
+            messages = [
+                (str(index % options['chats']), f'Alerta de teste {index}')
+                for index in range(options['messages'])
+            ]
+            started = time.monotonic()
+            results = client.send_batch(messages)
+            elapsed = time.monotonic() - started
+
+        stats = client.stats.snapshot()
+        errors = sum(1 for result in results if isinstance(result, Exception))
+        self.stdout.write(
+            f"{stats['sent']} mensagens em {elapsed:.2f}s "
+            f"({stats['sent'] / elapsed:.0f} msg/s), p99 {stats['p99_latency_ms']:.1f} ms, "
+            f"{errors} erros, {len(server.messages)} recebidas pelo mock"
+        )
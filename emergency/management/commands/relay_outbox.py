@@ -0,0 +1,14 @@
+
+from django.core.management.base import BaseCommand
+from emergency.outbox import run_relay
+
+class Command(BaseCommand):
+    help = 'Publica no broker as tarefas gravadas no outbox de alertas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--poll-interval', type=float, default=None)
+
+    def handle(self, *args, **options):
+        self.stdout.write('Relay do outbox iniciado')
+        run_relay(poll_interval=options['poll_interval'], batch_size=options['batch_size'])
@@ -1,8 +1,18 @@
 
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
+from datetime import timedelta
 import uuid
 
+class EmergencyAlertQuerySet(models.QuerySet):
+    def with_deliveries(self):
+        """Carregar os contatos notificados de todos os alertas em uma única consulta extra"""
+        return self.prefetch_related(models.Prefetch(
+            'deliveries',
+            queryset=EmergencyAlertDelivery.objects.only('id', 'alert_id', 'contact_id')
+        ))
+
 class EmergencyAlert(models.Model):
     STATUS_CHOICES = [
         ('sent', 'Enviado'),
@@ -10,20 +20,125 @@ class EmergencyAlert(models.Model):
         ('failed', 'Falhou'),
         ('pending', 'Pendente'),
     ]
+    # Alertas ainda em andamento: só estes recebem pontos de localização
+    ACTIVE_STATUSES = ('pending', 'sent')
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='emergency_alerts')
     message = models.TextField(blank=True, null=True)
     location = models.CharField(max_length=500, blank=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
-    contacts_notified = models.JSONField(default=list)
+    # Lista antiga (JSON) dos contatos notificados, só leitura. O comando
+    # backfill_alert_deliveries cria as entregas a partir dela; a coluna só
+    # pode sair depois do backfill
+    legacy_contacts_notified = models.JSONField(db_column='contacts_notified', default=list, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = EmergencyAlertQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Alerta de Emergência'
         verbose_name_plural = 'Alertas de Emergência'
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='emergency_alert_user_keyset'),
+        ]
 
     def __str__(self):
         return f"Alerta de {self.user.email} - {self.created_at.strftime('%d/%m/%Y %H:%M')}"
+
+    @property
+    def contacts_notified(self):
+        # Use prefetch_related('deliveries') para evitar uma consulta por alerta.
+        # Contatos já apagados (SET_NULL) ficam de fora. Alertas anteriores às
+        # entregas, ainda sem backfill, usam a lista antiga
+        deliveries = self.deliveries.all()
+        if not deliveries and self.legacy_contacts_notified:
+            return [str(contact_id) for contact_id in self.legacy_contacts_notified]
+        return [str(delivery.contact_id) for delivery in deliveries if delivery.contact_id]
+
+def sweep_after():
+    """
+    Quando a varredura pode assumir uma entrega nova: o despacho normal tem
+    EMERGENCY_DELIVERY_STALE_AFTER segundos antes
+    """
+    return timezone.now() + timedelta(seconds=settings.EMERGENCY_DELIVERY_STALE_AFTER)
+
+class EmergencyAlertDelivery(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pendente'),
+        ('sending', 'Enviando'),
+        ('sent', 'Enviado'),
+        ('failed', 'Falhou'),
+    ]
+    CHANNEL_CHOICES = [
+        ('telegram', 'Telegram'),
+        ('sms', 'SMS'),
+        ('push', 'Notificação push'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    alert = models.ForeignKey(EmergencyAlert, on_delete=models.CASCADE, related_name='deliveries', db_index=False)
+    contact = models.ForeignKey('contacts.EmergencyContact', on_delete=models.SET_NULL, null=True, related_name='alert_deliveries')
+    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES, default='telegram')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    next_attempt_at = models.DateTimeField(default=sweep_after)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = 'Entrega de Alerta'
+        verbose_name_plural = 'Entregas de Alertas'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='emergency_delivery_due_idx'),
+            models.Index(fields=['alert'], name='emergency_delivery_alert_idx'),
+        ]
+
+    def __str__(self):
+        return f"Entrega {self.get_status_display()} - alerta {self.alert_id}"
+
+class EmergencyAlertLocation(models.Model):
+    """Ponto da trilha de localização de um alerta (somente inserção)"""
+
+    alert = models.ForeignKey(EmergencyAlert, on_delete=models.CASCADE, related_name='location_trail', db_index=False)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    accuracy = models.FloatField(blank=True, null=True)
+    recorded_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['recorded_at']
+        verbose_name = 'Ponto de Localização'
+        verbose_name_plural = 'Trilha de Localização'
+        indexes = [
+            models.Index(fields=['alert', 'recorded_at', 'id'], name='emergency_trail_alert_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.latitude},{self.longitude} - {self.recorded_at.strftime('%d/%m/%Y %H:%M:%S')}"
+
+class AlertOutbox(models.Model):
+    """
+    Tarefas a publicar no broker, gravadas na mesma transação do alerta.
+    O relay (emergency.outbox) publica e apaga as linhas em lote
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    alert = models.ForeignKey(EmergencyAlert, on_delete=models.CASCADE, related_name='+', db_index=False)
+    task = models.CharField(max_length=255)
+    args = models.JSONField(default=list)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Outbox de Alertas'
+        verbose_name_plural = 'Outbox de Alertas'
+
+    def __str__(self):
+        return f"{self.task} - alerta {self.alert_id}"
@@ -0,0 +1,89 @@
+
+import logging
+import time
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from lia_project.celery import app
+from .models import AlertOutbox
+
+logger = logging.getLogger(__name__)
+
+def enqueue(alert_id, task, args):
+    """
+    Registrar uma tarefa para o broker dentro da transação corrente. Se a
+    transação falhar, nada é publicado; se o broker estiver fora, a linha
+    espera pelo relay
+    """
+    entry = AlertOutbox.objects.create(alert_id=alert_id, task=task, args=args)
+    if settings.OUTBOX_EAGER_RELAY:
+        # Caminho rápido: publicar logo após o commit; o relay cobre falhas
+        transaction.on_commit(lambda: eager_relay(entry.id))
+    return entry
+
+def eager_relay(entry_id):
+    """
+    Publicação feita dentro da requisição: conexão própria com timeout curto
+    e sem novas tentativas, para que um broker fora do ar não segure a
+    resposta. Qualquer falha fica para o relay_outbox
+    """
+    timeout = settings.OUTBOX_EAGER_TIMEOUT
+    try:
+        with app.connection_for_write(
+            connect_timeout=timeout,
+            transport_options={'max_retries': 0, 'socket_connect_timeout': timeout, 'socket_timeout': timeout},
+        ) as connection:
+            relay(ids=[entry_id], connection=connection)
+    except Exception:
+        logger.exception('Falha na publicação imediata; a tarefa fica para o relay')
+
+def relay(batch_size=None, ids=None, connection=None):
+    """
+    Publicar um lote de tarefas pendentes. SELECT ... FOR UPDATE SKIP LOCKED
+    permite vários relays em paralelo sem publicar a mesma linha duas vezes.
+    Com connection, publica por ela sem retry (caminho imediato).
+    Retorna (publicadas, atrasos em segundos desde o commit)
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    options = {'connection': connection, 'retry': False} if connection is not None else {}
+    published, lags, error = [], [], None
+    with transaction.atomic():
+        queryset = AlertOutbox.objects.select_for_update(skip_locked=True).order_by('id')
+        if ids is not None:
+            queryset = queryset.filter(id__in=ids)
+        entries = list(queryset[:batch_size])
+
+        now = timezone.now()
+        for entry in entries:
+            try:
+                app.signature(entry.task, args=entry.args).apply_async(**options)
+            except Exception as exc:
+                error = exc
+                break
+            published.append(entry.id)
+            lags.append((now - entry.created_at).total_seconds())
+
+        # Remove só o que foi publicado; o restante continua na fila
+        AlertOutbox.objects.filter(id__in=published).delete()
+        if error is not None:
+            AlertOutbox.objects.filter(id__in=[entry.id for entry in entries[len(published):]]).update(
+                attempts=F('attempts') + 1
+            )
+
+    if error is not None:
+        logger.warning('Falha ao publicar no broker (%s); %s tarefas ficam no outbox', error, len(entries) - len(published))
+    return len(published), lags
+
+def run_relay(poll_interval=None, batch_size=None, stop=None):
+    """Laço do processo relay: drena o outbox continuamente"""
+    poll_interval = settings.OUTBOX_POLL_INTERVAL if poll_interval is None else poll_interval
+    while stop is None or not stop.is_set():
+        try:
+            published, _ = relay(batch_size)
+        except Exception:
+            logger.exception('Erro no relay do outbox')
+            published = 0
+        # Com lote cheio, há mais trabalho: continua sem esperar
+        if published < (batch_size or settings.OUTBOX_BATCH_SIZE):
+            time.sleep(poll_interval)
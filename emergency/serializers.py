@@ -1,8 +1,15 @@
 
 from rest_framework import serializers
-from .models import EmergencyAlert
+from django.conf import settings
+from django.utils import timezone
+from contacts.routing import get_routing, invalidate_routing, load_routing
+from .models import EmergencyAlert, EmergencyAlertDelivery, EmergencyAlertLocation
+import uuid
 
 class EmergencyAlertSerializer(serializers.ModelSerializer):
+    # Lido de deliveries; as views devem usar prefetch_related('deliveries')
+    contacts_notified = serializers.ListField(child=serializers.CharField(), read_only=True)
+
     class Meta:
         model = EmergencyAlert
         fields = ('id', 'message', 'location', 'status', 'contacts_notified', 'created_at', 'updated_at')
@@ -19,18 +26,86 @@ class EmergencyAlertCreateSerializer(serializers.ModelSerializer):
         model = EmergencyAlert
         fields = ('message', 'location', 'contacts')
     
+    def validate_contacts(self, value):
+        """
+        Resolver os contatos pelo cache de roteamento do usuário. Se algum
+        não está lá (cache antigo: TTL, fallback local, update() sem sinais),
+        relê do banco uma vez antes de recusar
+        """
+        user_id = self.context['request'].user.pk
+        routing = get_routing(user_id)
+        requested = [str(contact_id) for contact_id in dict.fromkeys(value)]
+        unknown = [contact_id for contact_id in requested if contact_id not in routing]
+        if unknown:
+            routing = load_routing(user_id)
+            invalidate_routing(user_id)
+            unknown = [contact_id for contact_id in requested if contact_id not in routing]
+        if unknown:
+            raise serializers.ValidationError(f"Contatos não encontrados: {', '.join(unknown)}")
+        return [dict(routing[contact_id], contact_id=contact_id) for contact_id in requested]
+    
     def create(self, validated_data):
         contacts = validated_data.pop('contacts', [])
         user = self.context['request'].user
         
         alert = EmergencyAlert.objects.create(
+            id=validated_data.get('id') or uuid.uuid4(),
             user=user,
             message=validated_data.get('message', ''),
             location=validated_data.get('location', ''),
-            contacts_notified=[str(contact_id) for contact_id in contacts]
         )
         
-        # Aqui você pode implementar a lógica de envio de alertas
-        # Por exemplo, enviar SMS, email, notificações push, etc.
+        # Uma entrega por contato, gravadas em um único INSERT
+        deliveries = EmergencyAlertDelivery.objects.bulk_create([
+            EmergencyAlertDelivery(alert=alert, contact_id=contact['contact_id']) for contact in contacts
+        ])
+        
+        # Lista pronta para o despacho: os workers não precisam buscar os contatos
+        self.routing = [
+            {
+                'delivery_id': str(delivery.id),
+                'contact_id': contact['contact_id'],
+                'name': contact['name'],
+                'telegram_id': contact['telegram_id'],
+                'channel': delivery.channel,
+            }
+            for delivery, contact in zip(deliveries, contacts)
+        ]
         
         return alert
+
+class LocationPointSerializer(serializers.Serializer):
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    accuracy = serializers.FloatField(min_value=0, required=False, allow_null=True)
+    recorded_at = serializers.DateTimeField(required=False)
+
+class LocationTrailSerializer(serializers.Serializer):
+    points = serializers.ListField(
+        child=LocationPointSerializer(),
+        min_length=1,
+        max_length=settings.EMERGENCY_LOCATION_BATCH_LIMIT,
+        help_text="Pontos de localização acumulados pelo app desde o último envio"
+    )
+
+    def create(self, validated_data):
+        alert = self.context['alert']
+        now = timezone.now()
+        points = EmergencyAlertLocation.objects.bulk_create([
+            EmergencyAlertLocation(
+                alert=alert,
+                latitude=point['latitude'],
+                longitude=point['longitude'],
+                accuracy=point.get('accuracy'),
+                recorded_at=point.get('recorded_at') or now,
+            )
+            for point in validated_data['points']
+        ], batch_size=1000)
+
+        # Mantém o campo location do alerta com a posição mais recente
+        latest = max(points, key=lambda point: point.recorded_at)
+        EmergencyAlert.objects.filter(id=alert.id).update(
+            location=f'{latest.latitude:.6f},{latest.longitude:.6f}',
+            updated_at=now
+        )
+        return points
@@ -0,0 +1,238 @@
+
+import logging
+import time
+from datetime import timedelta
+from celery import chord, shared_task
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from contacts.models import EmergencyContact
+from .models import EmergencyAlert, EmergencyAlertDelivery
+from .transports import PermanentTransportError, TransportError, get_transport
+
+logger = logging.getLogger(__name__)
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def dispatch_emergency_alert(alert_id, routing=None):
+    """
+    Distribuir o alerta em uma tarefa de entrega por contato, executadas em paralelo.
+    
+    routing é a lista pronta montada pelo EmergencyAlertCreateSerializer; sem
+    ela (ex.: reenvio manual), as rotas pendentes são lidas em uma consulta
+    """
+    if routing is None:
+        routing = build_routing(
+            EmergencyAlertDelivery.objects.filter(alert_id=alert_id, status='pending')
+        )
+    fan_out(alert_id, routing)
+
+def build_routing(deliveries):
+    """Rotas de envio (entrega + dados do contato) com uma única consulta"""
+    return [
+        {
+            'delivery_id': str(row['id']),
+            'contact_id': str(row['contact_id']) if row['contact_id'] else None,
+            'name': row['contact__name'],
+            'telegram_id': row['contact__telegram_id'],
+            'channel': row['channel'],
+        }
+        for row in deliveries.values('id', 'channel', 'contact_id', 'contact__name', 'contact__telegram_id')
+    ]
+
+def fan_out(alert_id, routing):
+    """Uma tarefa de entrega por contato; o callback do chord consolida o resultado"""
+    if not routing:
+        finalize_emergency_alert.delay([], alert_id)
+        return
+
+    chord(
+        deliver_alert_to_contact.s(alert_id, route) for route in routing
+    )(finalize_emergency_alert.s(alert_id))
+
+@shared_task(bind=True, max_retries=settings.EMERGENCY_DELIVERY_MAX_RETRIES, acks_late=True, reject_on_worker_lost=True)
+def deliver_alert_to_contact(self, alert_id, route):
+    """Entregar o alerta a um único contato, com retentativas e backoff exponencial"""
+    delivery_id = route['delivery_id']
+    if route['contact_id'] is None:
+        return {'delivery_id': delivery_id, 'delivered': False, 'error': 'Contato removido'}
+
+    # Reentregas são esperadas (acks_late, relay do outbox, varredura): só
+    # quem marca a entrega como 'sending' envia
+    if not claim_deliveries([delivery_id]):
+        return delivery_outcome(delivery_id)
+
+    alert = EmergencyAlert.objects.select_related('user').get(id=alert_id)
+    # A rota já traz tudo o que o transporte precisa; não há consulta ao contato
+    contact = EmergencyContact(
+        id=route['contact_id'], user_id=alert.user_id, name=route['name'], telegram_id=route['telegram_id']
+    )
+
+    try:
+        get_transport().send(alert, contact)
+    except PermanentTransportError as exc:
+        return {'delivery_id': delivery_id, 'delivered': False, 'error': str(exc)}
+    except TransportError as exc:
+        if self.request.retries < self.max_retries:
+            countdown = retry_delay(self.request.retries, exc)
+            # O retry do Celery vem primeiro; a varredura só entra se ele se perder
+            EmergencyAlertDelivery.objects.filter(id=delivery_id).update(
+                status='pending',
+                attempts=F('attempts') + 1,
+                last_error=str(exc),
+                next_attempt_at=timezone.now() + timedelta(seconds=countdown + settings.EMERGENCY_DELIVERY_STALE_AFTER),
+                updated_at=timezone.now()
+            )
+            raise self.retry(exc=exc, countdown=countdown)
+        logger.error('Entrega %s do alerta %s falhou: %s', delivery_id, alert_id, exc)
+        return {'delivery_id': delivery_id, 'delivered': False, 'error': str(exc)}
+
+    return {'delivery_id': delivery_id, 'delivered': True}
+
+@shared_task(acks_late=True)
+def finalize_emergency_alert(results, alert_id):
+    """Gravar o resultado das entregas em lote e consolidar o status do alerta"""
+    now = timezone.now()
+    # Resultados de reentregas que não enviaram nada (a entrega já tinha dono)
+    results = [result for result in results if not result.get('skipped')]
+    delivered = [result['delivery_id'] for result in results if result['delivered']]
+    failed = {result['delivery_id']: result['error'] for result in results if not result['delivered']}
+
+    mark_deliveries(delivered, 'sent', sent_at=now)
+    mark_deliveries_by_error(failed, 'failed')
+
+    refresh_alert_status(alert_id)
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def deliver_batch(delivery_ids):
+    """
+    Entregar de uma vez entregas de vários alertas: o transporte envia tudo
+    pelo mesmo pool de conexões e os resultados são gravados em lote
+    """
+    deliveries = list(
+        EmergencyAlertDelivery.objects.select_related('alert__user', 'contact')
+        .filter(id__in=claim_deliveries(delivery_ids))
+    )
+    sendable = [delivery for delivery in deliveries if delivery.contact is not None]
+    results = get_transport().send_many(
+        [(delivery.alert, delivery.contact) for delivery in sendable]
+    )
+
+    now = timezone.now()
+    delivered, failed, retry = [], {}, {}
+    for delivery, error in zip(sendable, results):
+        if error is None:
+            delivered.append(delivery.id)
+        elif isinstance(error, PermanentTransportError) or delivery.attempts + 1 >= settings.EMERGENCY_DELIVERY_MAX_RETRIES:
+            failed[delivery.id] = str(error)
+        else:
+            retry[delivery.id] = (str(error), retry_delay(delivery.attempts, error))
+    failed.update({delivery.id: 'Contato removido' for delivery in deliveries if delivery.contact is None})
+
+    mark_deliveries(delivered, 'sent', sent_at=now)
+    mark_deliveries_by_error(failed, 'failed')
+    # Continuam pendentes; a varredura tenta de novo depois do backoff (ou do retry_after do provedor)
+    by_delay = {}
+    for delivery_id, (error, delay) in retry.items():
+        by_delay.setdefault(delay, {})[delivery_id] = error
+    for delay, errors in by_delay.items():
+        mark_deliveries_by_error(errors, 'pending', next_attempt_at=now + timedelta(seconds=delay))
+
+    for alert_id in {delivery.alert_id for delivery in deliveries}:
+        refresh_alert_status(alert_id)
+    return {'sent': len(delivered), 'failed': len(failed), 'retry': len(retry)}
+
+@shared_task
+def requeue_pending_deliveries(batch_size=500):
+    """Reenfileirar entregas pendentes vencidas (ex.: worker reiniciado no meio do envio)"""
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.EMERGENCY_DELIVERY_STALE_AFTER)
+    # Presas em 'sending' há muito tempo: o worker morreu antes de gravar o resultado
+    is_due = Q(status='pending', next_attempt_at__lte=now) | Q(status='sending', updated_at__lte=stale)
+    due = list(
+        EmergencyAlertDelivery.objects.filter(is_due)
+        .order_by('next_attempt_at').values_list('id', flat=True)[:batch_size]
+    )
+    if not due:
+        return 0
+
+    # Adiar antes de enfileirar para que a próxima varredura não duplique o envio
+    EmergencyAlertDelivery.objects.filter(is_due, id__in=due).update(
+        status='pending', next_attempt_at=now + timedelta(seconds=settings.EMERGENCY_DELIVERY_STALE_AFTER), updated_at=now
+    )
+    batch_ids = [str(delivery_id) for delivery_id in due]
+    chunk = settings.EMERGENCY_DELIVERY_BATCH_SIZE
+    for start in range(0, len(batch_ids), chunk):
+        deliver_batch.delay(batch_ids[start:start + chunk])
+    return len(due)
+
+def refresh_alert_status(alert_id):
+    """Consolidar o status do alerta a partir de uma contagem agrupada das entregas"""
+    counts = dict(
+        EmergencyAlertDelivery.objects.filter(alert_id=alert_id)
+        .values_list('status').order_by().annotate(total=Count('id'))
+    )
+    if counts.get('sent') or not counts:
+        alert_status = 'sent'
+    elif counts.get('pending') or counts.get('sending'):
+        return
+    else:
+        alert_status = 'failed'
+    EmergencyAlert.objects.filter(id=alert_id).update(status=alert_status, updated_at=timezone.now())
+
+def retry_delay(attempts, error):
+    """Backoff exponencial, respeitando o retry_after do provedor quando maior"""
+    return max(settings.EMERGENCY_DELIVERY_RETRY_BACKOFF * (2 ** attempts), getattr(error, 'retry_after', 0))
+
+def claim_deliveries(delivery_ids):
+    """
+    Marcar como 'sending' as entregas ainda pendentes (ou presas em 'sending'
+    há mais de EMERGENCY_DELIVERY_STALE_AFTER, ex.: worker morto no meio do
+    envio) e devolver os ids conseguidos. Execuções concorrentes da mesma
+    entrega disputam a mesma linha; só uma leva
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.EMERGENCY_DELIVERY_STALE_AFTER)
+    with transaction.atomic():
+        claimed = list(
+            EmergencyAlertDelivery.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='pending') | Q(status='sending', updated_at__lte=stale), id__in=delivery_ids)
+            .values_list('id', flat=True)
+        )
+        EmergencyAlertDelivery.objects.filter(id__in=claimed).update(status='sending', updated_at=now)
+    return claimed
+
+def delivery_outcome(delivery_id):
+    """
+    Resultado de uma execução que não conseguiu a entrega: o estado já
+    gravado por quem enviou. O finalize ignora resultados 'skipped'
+    """
+    status = EmergencyAlertDelivery.objects.filter(id=delivery_id).values_list('status', flat=True).first()
+    return {'delivery_id': delivery_id, 'skipped': True, 'status': status}
+
+def mark_deliveries(delivery_ids, status, **fields):
+    """Atualizar o status de várias entregas com um único UPDATE"""
+    if not delivery_ids:
+        return 0
+    return EmergencyAlertDelivery.objects.filter(id__in=delivery_ids).update(
+        status=status,
+        attempts=F('attempts') + 1,
+        updated_at=timezone.now(),
+        **fields
+    )
+
+def mark_deliveries_by_error(errors, status, **fields):
+    """
+    Como mark_deliveries, mas cada entrega guarda o próprio erro: um UPDATE
+    por mensagem distinta ({delivery_id: erro})
+    """
+    by_error = {}
+    for delivery_id, error in errors.items():
+        by_error.setdefault(error, []).append(delivery_id)
+    for error, delivery_ids in by_error.items():
+        mark_deliveries(delivery_ids, status, last_error=error, **fields)
+
+@shared_task
+def latency_probe(enqueued_at):
+    """Tarefa vazia usada pelo bench_queues para medir a espera na fila emergency"""
+    return time.time() - enqueued_at
@@ -0,0 +1,185 @@
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from .transports import PermanentTransportError, TransportError
+
+class TelegramError(TransportError):
+    """Falha ao enviar mensagem pela Bot API do Telegram"""
+
+class TelegramRejected(TelegramError, PermanentTransportError):
+    """Mensagem recusada (chat inexistente, bot bloqueado, etc.)"""
+
+class TelegramRateLimited(TelegramError):
+    """Limite de envio atingido; tente novamente depois de retry_after segundos"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """
+    Token bucket com reserva: cada envio consome um token e recebe de volta
+    quanto tempo precisa esperar até que esse token exista
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self):
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+    @property
+    def idle(self):
+        with self.lock:
+            elapsed = time.monotonic() - self.updated
+            return self.tokens + elapsed * self.rate >= self.capacity
+
+class SendStats:
+    """Vazão e latência dos envios recentes deste processo"""
+
+    def __init__(self, window=10000):
+        self.latencies = deque(maxlen=window)
+        self.sent = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+
+    def record(self, latency, ok=True):
+        with self.lock:
+            self.latencies.append(latency)
+            if ok:
+                self.sent += 1
+            else:
+                self.failed += 1
+
+    def snapshot(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            elapsed = time.monotonic() - self.started
+            sent, failed = self.sent, self.failed
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else 0
+        return {
+            'sent': sent,
+            'failed': failed,
+            'messages_per_sec': sent / elapsed if elapsed else 0,
+            'p99_latency_ms': p99 * 1000,
+        }
+
+class TelegramClient:
+    """
+    Cliente da Bot API com uma única sessão HTTP (pool de conexões keep-alive)
+    por processo, limites por bot e por chat e envio em lote.
+    
+    Os limites valem para o processo: com N workers, configure
+    TELEGRAM_BOT_RATE como o limite global do bot dividido por N.
+    """
+
+    MAX_CHAT_BUCKETS = 10000
+
+    def __init__(self, token=None, api_url=None, pool_size=None,
+                 bot_rate=None, chat_rate=None, chat_burst=None, max_wait=None):
+        self.token = token or settings.TELEGRAM_BOT_TOKEN
+        self.api_url = (api_url or settings.TELEGRAM_API_URL).rstrip('/')
+        self.pool_size = pool_size or settings.TELEGRAM_POOL_SIZE
+        self.chat_rate = chat_rate or settings.TELEGRAM_CHAT_RATE
+        self.chat_burst = chat_burst or settings.TELEGRAM_CHAT_BURST
+        self.max_wait = settings.TELEGRAM_MAX_WAIT if max_wait is None else max_wait
+        bot_rate = bot_rate or settings.TELEGRAM_BOT_RATE
+        self.bot_bucket = TokenBucket(bot_rate, bot_rate)
+        self.chat_buckets = {}
+        self.buckets_lock = threading.Lock()
+        self.stats = SendStats()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _chat_bucket(self, chat_id):
+        with self.buckets_lock:
+            bucket = self.chat_buckets.get(chat_id)
+            if bucket is None:
+                if len(self.chat_buckets) >= self.MAX_CHAT_BUCKETS:
+                    self.chat_buckets = {
+                        key: value for key, value in self.chat_buckets.items() if not value.idle
+                    }
+                bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+            return bucket
+
+    def _throttle(self, chat_id):
+        chat_bucket = self._chat_bucket(chat_id)
+        wait = max(self.bot_bucket.reserve(), chat_bucket.reserve())
+        if wait > self.max_wait:
+            # Melhor devolver a mensagem para a fila do que segurar o worker
+            self.bot_bucket.refund()
+            chat_bucket.refund()
+            raise TelegramRateLimited(f'Limite de envio para o chat {chat_id}', retry_after=wait)
+        if wait:
+            time.sleep(wait)
+
+    def send_message(self, chat_id, text):
+        self._throttle(chat_id)
+        started = time.monotonic()
+        try:
+            response = self.session.post(
+                f'{self.api_url}/bot{self.token}/sendMessage',
+                json={'chat_id': chat_id, 'text': text},
+                timeout=settings.TELEGRAM_TIMEOUT,
+            )
+        except requests.RequestException as exc:
+            self.stats.record(time.monotonic() - started, ok=False)
+            raise TelegramError(str(exc)) from exc
+        self.stats.record(time.monotonic() - started, ok=response.ok)
+
+        if response.status_code == 429:
+            retry_after = response.json().get('parameters', {}).get('retry_after', 1)
+            raise TelegramRateLimited('Telegram respondeu 429', retry_after=retry_after)
+        if response.status_code in (400, 403, 404):
+            raise TelegramRejected(f'Telegram recusou a mensagem: {response.text[:200]}')
+        if not response.ok:
+            raise TelegramError(f'Telegram respondeu {response.status_code}: {response.text[:200]}')
+        return response.json()
+
+    def send_batch(self, messages):
+        """
+        Enviar várias mensagens (chat_id, text), de quaisquer alertas, em
+        paralelo pelo mesmo pool de conexões. Retorna uma lista na mesma ordem
+        com o resultado da API ou a exceção de cada envio
+        """
+        def send(message):
+            try:
+                return self.send_message(*message)
+            except TelegramError as exc:
+                return exc
+
+        with ThreadPoolExecutor(max_workers=self.pool_size) as executor:
+            return list(executor.map(send, messages))
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Cliente compartilhado pelo processo (cada worker do Celery tem o seu)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = TelegramClient()
+        return _client
@@ -0,0 +1,63 @@
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class MockTelegramHandler(BaseHTTPRequestHandler):
+    path_pattern = re.compile(r'^/bot[^/]+/sendMessage$')
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if not self.path_pattern.match(self.path):
+            return self._reply(404, {'ok': False, 'description': 'Not Found'})
+
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        payload = json.loads(body or b'{}')
+        with server.lock:
+            server.messages.append(payload)
+            message_id = len(server.messages)
+        self._reply(200, {'ok': True, 'result': {'message_id': message_id, 'chat': {'id': payload.get('chat_id')}}})
+
+    def _reply(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class MockTelegramServer(ThreadingHTTPServer):
+    """
+    Servidor HTTP local que imita o sendMessage da Bot API, para testes e
+    benchmarks sem acesso à rede. Use como context manager e aponte
+    TELEGRAM_API_URL para server.url
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0):
+        super().__init__((host, port), MockTelegramHandler)
+        self.latency = latency
+        self.messages = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,120 @@
+
+import logging
+import threading
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+class TransportError(Exception):
+    """Falha temporária de entrega; a tarefa de envio pode tentar novamente"""
+
+class PermanentTransportError(TransportError):
+    """Falha definitiva (ex.: contato sem Telegram); não adianta tentar novamente"""
+
+class BaseTransport:
+    """Interface comum dos canais de entrega de alertas de emergência"""
+
+    channel = 'base'
+
+    def send(self, alert, contact):
+        raise NotImplementedError
+
+    def send_many(self, pairs):
+        """
+        Enviar vários pares (alerta, contato). Retorna, na mesma ordem, None
+        para cada envio bem-sucedido ou a TransportError correspondente
+        """
+        results = []
+        for alert, contact in pairs:
+            try:
+                self.send(alert, contact)
+                results.append(None)
+            except TransportError as exc:
+                results.append(exc)
+        return results
+
+    def build_message(self, alert, contact):
+        text = f"🚨 ALERTA DE EMERGÊNCIA de {alert.user.name or alert.user.email}"
+        if alert.message:
+            text += f"\n{alert.message}"
+        if alert.location:
+            text += f"\nLocalização: {alert.location}"
+        return text
+
+class LoggingTransport(BaseTransport):
+    """Transporte padrão: apenas registra o envio no log"""
+
+    channel = 'log'
+
+    def send(self, alert, contact):
+        logger.info('Alerta %s enviado para o contato %s', alert.id, contact.id)
+
+class TelegramTransport(BaseTransport):
+    """Envio pela Bot API do Telegram, usando o cliente compartilhado do processo"""
+
+    channel = 'telegram'
+
+    def send(self, alert, contact):
+        from .telegram import get_client
+
+        if not contact.telegram_id:
+            raise PermanentTransportError(f'Contato {contact.id} sem telegram_id')
+        get_client().send_message(contact.telegram_id, self.build_message(alert, contact))
+
+    def send_many(self, pairs):
+        from .telegram import TelegramError, get_client
+
+        results = [None] * len(pairs)
+        messages, positions = [], []
+        for position, (alert, contact) in enumerate(pairs):
+            if contact.telegram_id:
+                messages.append((contact.telegram_id, self.build_message(alert, contact)))
+                positions.append(position)
+            else:
+                results[position] = PermanentTransportError(f'Contato {contact.id} sem telegram_id')
+        for position, result in zip(positions, get_client().send_batch(messages)):
+            if isinstance(result, TelegramError):
+                results[position] = result
+        return results
+
+class LocalStubTransport(BaseTransport):
+    """
+    Transporte local para testes ponta a ponta: guarda as mensagens em memória
+    e pode falhar as primeiras N tentativas para exercitar os retries
+    """
+
+    channel = 'stub'
+    outbox = []
+    fail_first = 0
+    _attempts = {}
+    _lock = threading.Lock()
+
+    def send(self, alert, contact):
+        key = (str(alert.id), str(contact.id))
+        with self._lock:
+            attempt = self._attempts.get(key, 0) + 1
+            self._attempts[key] = attempt
+            if attempt <= self.fail_first:
+                raise TransportError(f'Falha simulada (tentativa {attempt})')
+            self.outbox.append({
+                'alert_id': key[0],
+                'contact_id': key[1],
+                'text': self.build_message(alert, contact),
+            })
+
+    @classmethod
+    def reset(cls, fail_first=0):
+        with cls._lock:
+            cls.outbox.clear()
+            cls._attempts.clear()
+            cls.fail_first = fail_first
+
+_transports = {}
+
+def get_transport():
+    """Instância única por processo do transporte configurado"""
+    path = settings.EMERGENCY_ALERT_TRANSPORT
+    if path not in _transports:
+        _transports[path] = import_string(path)()
+    return _transports[path]
@@ -6,4 +6,5 @@ urlpatterns = [
     path('alert', views.send_emergency_alert, name='emergency-alert'),
     path('alerts/', views.EmergencyAlertListView.as_view(), name='emergency-alerts-list'),
     path('alerts/<uuid:alert_id>/', views.emergency_alert_detail, name='emergency-alert-detail'),
+    path('alerts/<uuid:alert_id>/locations/', views.emergency_alert_locations, name='emergency-alert-locations'),
 ]
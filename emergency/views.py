@@ -4,48 +4,91 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import OrderingFilter
-from .models import EmergencyAlert
-from .serializers import EmergencyAlertSerializer, EmergencyAlertCreateSerializer
+from lia_project.pagination import KeysetPagination, decode_cursor, encode_cursor, seek
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Max
+from .models import EmergencyAlert, EmergencyAlertLocation
+from .serializers import EmergencyAlertSerializer, EmergencyAlertCreateSerializer, LocationTrailSerializer
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+from .tasks import dispatch_emergency_alert
+from . import idempotency, outbox
 import uuid
 
 class EmergencyAlertListView(generics.ListAPIView):
     serializer_class = EmergencyAlertSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend]
     filterset_fields = ['status']
-    ordering = ['-created_at']
     
     def get_queryset(self):
-        return EmergencyAlert.objects.filter(user=self.request.user)
+        return EmergencyAlert.objects.filter(user=self.request.user).with_deliveries()
+
+def _replay(record, request_fingerprint):
+    if record['fingerprint'] != request_fingerprint:
+        return Response(
+            {'error': 'Idempotency-Key já utilizada com outro conteúdo'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    return Response(record['body'], status=status.HTTP_202_ACCEPTED, headers={'Idempotent-Replayed': 'true'})
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def send_emergency_alert(request):
     """
-    Enviar um alerta de emergência para contatos selecionados
+    Enviar um alerta de emergência para contatos selecionados.
+    
+    Com o header Idempotency-Key, repetições da mesma requisição (botão de
+    pânico pressionado várias vezes, retries do app) devolvem o alerta
+    original direto do cache, sem criar outro alerta nem tocar no banco.
     """
+    idempotency_key = request.headers.get('Idempotency-Key')
+    if idempotency_key:
+        if len(idempotency_key) > 255:
+            return Response({'error': 'Idempotency-Key inválida'}, status=status.HTTP_400_BAD_REQUEST)
+        request_fingerprint = idempotency.fingerprint(request.data)
+        record = idempotency.lookup(request.user, idempotency_key)
+        if record is not None:
+            return _replay(record, request_fingerprint)
+    
     serializer = EmergencyAlertCreateSerializer(data=request.data, context={'request': request})
     
     if serializer.is_valid():
-        alert = serializer.save()
+        alert_id = uuid.uuid4()
+        body = {
+            'message': 'Alerta de emergência recebido e em processamento',
+            'alertId': str(alert_id),
+            'status': 'pending',
+            'contacts_notified': len(serializer.validated_data['contacts'])
+        }
         
-        # Simular processamento do alerta
-        # Em um ambiente real, aqui você implementaria:
-        # - Envio de SMS
-        # - Envio de emails
-        # - Notificações push
-        # - Integração com serviços de emergência
+        if idempotency_key:
+            # Reservar a chave antes de criar o alerta: requisições concorrentes
+            # com a mesma chave recebem este mesmo alertId
+            try:
+                record = idempotency.reserve(request.user, idempotency_key, request_fingerprint, body)
+            except idempotency.KeyInUse:
+                return Response(
+                    {'error': 'Requisição com esta Idempotency-Key em andamento; tente novamente'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            if record is not None:
+                return _replay(record, request_fingerprint)
         
-        alert.status = 'sent'
-        alert.save()
+        try:
+            with transaction.atomic():
+                serializer.save(id=alert_id)
+                # O envio acontece nos workers do Celery; a tarefa vai para o
+                # outbox na mesma transação do alerta e o relay a publica
+                outbox.enqueue(alert_id, dispatch_emergency_alert.name, [str(alert_id), serializer.routing])
+        except Exception:
+            if idempotency_key:
+                idempotency.release(request.user, idempotency_key)
+            raise
         
-        return Response({
-            'message': 'Alerta de emergência enviado com sucesso',
-            'alertId': str(alert.id),
-            'status': alert.status,
-            'contacts_notified': len(alert.contacts_notified)
-        }, status=status.HTTP_200_OK)
+        return Response(body, status=status.HTTP_202_ACCEPTED)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -56,8 +99,79 @@ def emergency_alert_detail(request, alert_id):
     Obter detalhes de um alerta específico
     """
     try:
-        alert = EmergencyAlert.objects.get(id=alert_id, user=request.user)
+        alert = EmergencyAlert.objects.filter(user=request.user).with_deliveries().get(id=alert_id)
         serializer = EmergencyAlertSerializer(alert)
         return Response(serializer.data)
     except EmergencyAlert.DoesNotExist:
         return Response({'error': 'Alerta não encontrado'}, status=status.HTTP_404_NOT_FOUND)
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def emergency_alert_locations(request, alert_id):
+    """
+    Trilha de localização de um alerta.
+    
+    POST recebe vários pontos de uma vez ({'points': [...]}) e grava tudo em
+    um único INSERT; só alertas ativos (pendente ou enviado) aceitam pontos.
+    GET devolve os pontos em ordem cronológica, a partir do
+    ?cursor= da resposta anterior (ou de ?since=<ISO 8601>, exclusivo), com
+    uma consulta no índice (alert, recorded_at, id).
+    """
+    if request.method == 'POST':
+        alert = EmergencyAlert.objects.filter(id=alert_id, user=request.user).only('id', 'status').first()
+        if alert is None:
+            return Response({'error': 'Alerta não encontrado'}, status=status.HTTP_404_NOT_FOUND)
+        if alert.status not in EmergencyAlert.ACTIVE_STATUSES:
+            return Response({'error': 'Alerta encerrado não recebe novos pontos', 'status': alert.status}, status=status.HTTP_409_CONFLICT)
+        
+        serializer = LocationTrailSerializer(data=request.data, context={'request': request, 'alert': alert})
+        if serializer.is_valid():
+            points = serializer.save()
+            return Response({'received': len(points)}, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    queryset = EmergencyAlertLocation.objects.filter(alert_id=alert_id, alert__user=request.user)
+    ordering = ('recorded_at', 'id')
+    cursor = request.query_params.get('cursor')
+    since = request.query_params.get('since')
+    if cursor:
+        # (recorded_at, id) é único: pontos com o mesmo horário não se perdem entre páginas
+        try:
+            recorded_at, point_id = decode_cursor(cursor)['v']
+            values = [EmergencyAlertLocation._meta.get_field('recorded_at').to_python(recorded_at), int(point_id)]
+        except (TypeError, ValueError, KeyError, ValidationError):
+            return Response({'error': 'Parâmetro cursor inválido'}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = queryset.filter(seek(ordering, values))
+    elif since:
+        since_dt = parse_datetime(since)
+        if since_dt is None:
+            return Response({'error': 'Parâmetro since inválido'}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = queryset.filter(recorded_at__gt=since_dt)
+    
+    limit = settings.EMERGENCY_LOCATION_PAGE_SIZE
+    rows = list(queryset.order_by(*ordering).values_list(
+        'id', 'latitude', 'longitude', 'accuracy', 'recorded_at'
+    )[:limit])
+    points = [
+        {'latitude': latitude, 'longitude': longitude, 'accuracy': accuracy, 'recorded_at': recorded_at}
+        for _, latitude, longitude, accuracy, recorded_at in rows
+    ]
+    
+    # Só confere a existência do alerta quando a trilha veio vazia
+    if not points and not EmergencyAlert.objects.filter(id=alert_id, user=request.user).exists():
+        return Response({'error': 'Alerta não encontrado'}, status=status.HTTP_404_NOT_FOUND)
+    
+    if rows:
+        last_id, *_, last_recorded_at = rows[-1]
+        cursor = encode_cursor([last_recorded_at.isoformat(), last_id])
+    elif since and not cursor:
+        # Cursor equivalente ao since (exclusivo): depois do último ponto com
+        # exatamente esse horário, se houver
+        last_id = EmergencyAlertLocation.objects.filter(alert_id=alert_id, recorded_at=since_dt).aggregate(last=Max('id'))['last']
+        cursor = encode_cursor([since_dt.isoformat(), last_id or 0])
+    return Response({
+        'points': points,
+        'has_more': len(points) == limit,
+        # Passar como ?cursor= para continuar (ou acompanhar novos pontos) a partir daqui
+        'cursor': cursor,
+    })
@@ -0,0 +1,76 @@
+
+import logging
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+class ResilientCache:
+    """
+    Cache que usa o Redis (alias 'default') e cai para a memória local do
+    processo (alias 'local') quando o Redis está indisponível
+    """
+
+    def __init__(self, primary='default', fallback='local'):
+        self.primary = primary
+        self.fallback = fallback
+
+    def _call(self, method, *args, **kwargs):
+        try:
+            return getattr(caches[self.primary], method)(*args, **kwargs)
+        except ValueError:
+            # incr de chave inexistente: o cache respondeu, não está fora
+            raise
+        except Exception as exc:
+            logger.warning('Cache %s indisponível (%s); usando %s', self.primary, exc, self.fallback)
+            return getattr(caches[self.fallback], method)(*args, **kwargs)
+
+    def get(self, key, default=None):
+        return self._call('get', key, default)
+
+    def get_many(self, keys):
+        return self._call('get_many', keys)
+
+    def set(self, key, value, timeout=None):
+        return self._call('set', key, value, timeout)
+
+    def set_many(self, data, timeout=None):
+        return self._call('set_many', data, timeout)
+
+    def add(self, key, value, timeout=None):
+        return self._call('add', key, value, timeout)
+
+    def incr(self, key, delta=1):
+        return self._call('incr', key, delta)
+
+    def delete(self, key):
+        return self._call('delete', key)
+
+    def delete_many(self, keys):
+        return self._call('delete_many', keys)
+
+cache = ResilientCache()
+
+def version_key(prefix, object_id):
+    return f'{prefix}-version:{object_id}'
+
+def current_version(prefix, object_id):
+    key = version_key(prefix, object_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, None)
+        version = cache.get(key) or 1
+    return version
+
+def versioned_key(prefix, object_id):
+    """
+    Chave vigente dos dados de object_id. Gravações incrementam a versão
+    (invalidate_version), então leituras concorrentes nunca voltam a publicar dados
+    antigos na chave vigente
+    """
+    return f'{prefix}:{object_id}:v{current_version(prefix, object_id)}'
+
+def invalidate_version(prefix, object_id):
+    try:
+        cache.incr(version_key(prefix, object_id))
+    except ValueError:
+        cache.add(version_key(prefix, object_id), 1, None)
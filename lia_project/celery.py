@@ -1,5 +1,6 @@
 
 import os
+import time
 from celery import Celery
 
 # Set default Django settings module
@@ -17,3 +18,8 @@ app.autodiscover_tasks()
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
+
+@app.task
+def bulk_load_task(seconds):
+    """Carga sintética da fila bulk usada pelo bench_queues"""
+    time.sleep(seconds)
@@ -0,0 +1,142 @@
+
+import base64
+import json
+from collections import OrderedDict
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+def seek(ordering, values):
+    """
+    Condição "depois de (v1, v2, ...)" na ordem dada:
+    f1 >= v1 AND (f1 > v1 OR (f1 = v1 AND f2 > v2) ...), com < para campos
+    descendentes. O primeiro termo deixa o banco posicionar direto no índice
+    """
+    def op(field):
+        return 'lt' if field.startswith('-') else 'gt'
+
+    condition = None
+    for field, value in reversed(list(zip(ordering, values))):
+        name = field.lstrip('-')
+        strict = Q(**{f'{name}__{op(field)}': value})
+        condition = strict if condition is None else strict | (Q(**{name: value}) & condition)
+
+    first, first_value = ordering[0], values[0]
+    return Q(**{f'{first.lstrip("-")}__{op(first)}e': first_value}) & condition
+
+def encode_cursor(values, **extra):
+    """Cursor opaco (base64 de JSON) com os valores da chave da última linha"""
+    payload = json.dumps(dict(extra, v=values), separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(encoded):
+    """Inverso de encode_cursor; ValueError se o cursor não for válido"""
+    payload = json.loads(base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+    if not isinstance(payload, dict) or not isinstance(payload.get('v'), list):
+        raise ValueError('cursor')
+    return payload
+
+class KeysetPagination(BasePagination):
+    """
+    Paginação por cursor (keyset) sobre uma chave composta única, por padrão
+    (created_at, id). Cada página é um seek no índice (user, chave), então
+    a página 1000 custa o mesmo que a primeira, ao contrário do OFFSET.
+    
+    A resposta tem o formato {'next', 'previous', 'results'}; os links
+    carregam o cursor opaco no parâmetro ?cursor=.
+    """
+
+    ordering = ('-created_at', '-id')
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    results_key = 'results'
+    invalid_cursor_message = 'Cursor inválido'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        values, reverse = self.decode_cursor(request, queryset.model)
+
+        ordering = [self._invert(field) for field in self.ordering] if reverse else list(self.ordering)
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(ordering, values))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            (self.results_key, data),
+        ]))
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self._link(self.page[0], reverse=True)
+
+    def _link(self, row, reverse):
+        values = [self._field_value(row, field) for field in self.ordering]
+        return replace_query_param(self.base_url, self.cursor_query_param, encode_cursor(values, r=reverse))
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = decode_cursor(encoded)
+            values = [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, payload['v'], strict=True)
+            ]
+            return values, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def _field_value(row, field):
+        value = getattr(row, field.lstrip('-'))
+        return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def _seek(ordering, values):
+        return seek(ordering, values)
+
+class NameKeysetPagination(KeysetPagination):
+    """Paginação por cursor de listas ordenadas alfabeticamente (name, id)"""
+
+    ordering = ('name', 'id')
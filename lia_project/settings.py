@@ -2,6 +2,7 @@
 import os
 from pathlib import Path
 from decouple import config
+from kombu import Queue
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -22,6 +23,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third party apps
     'rest_framework',
@@ -34,6 +36,7 @@ INSTALLED_APPS = [
     'diary',
     'contacts',
     'emergency',
+    'sync',
 ]
 
 MIDDLEWARE = [
@@ -112,20 +115,53 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Envio retomável de anexos do diário
+DIARY_UPLOAD_TEMP_DIR = config('DIARY_UPLOAD_TEMP_DIR', default=os.path.join(MEDIA_ROOT, 'uploads_tmp'))
+DIARY_UPLOAD_CHUNK_SIZE = config('DIARY_UPLOAD_CHUNK_SIZE', default=8 * 1024 * 1024, cast=int)
+DIARY_UPLOAD_MAX_SIZE = config('DIARY_UPLOAD_MAX_SIZE', default=2 * 1024 * 1024 * 1024, cast=int)
+
+# Operações por requisição em /api/diary/bulk/
+DIARY_BULK_MAX_ITEMS = config('DIARY_BULK_MAX_ITEMS', default=500, cast=int)
+
+# Maior período aceito por /api/diary/analytics/
+DIARY_ANALYTICS_MAX_DAYS = config('DIARY_ANALYTICS_MAX_DAYS', default=3660, cast=int)
+
+# Exportação da conta em segundo plano: por quanto tempo o ZIP fica disponível
+ACCOUNT_EXPORT_TTL = config('ACCOUNT_EXPORT_TTL', default=86400, cast=int)
+
+# Sincronização incremental (/api/sync/)
+SYNC_PAGE_SIZE = config('SYNC_PAGE_SIZE', default=500, cast=int)
+SYNC_SETTLE_SECONDS = config('SYNC_SETTLE_SECONDS', default=2, cast=int)
+SYNC_TOMBSTONE_TTL_DAYS = config('SYNC_TOMBSTONE_TTL_DAYS', default=90, cast=int)
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # REST Framework configuration
+# Autenticação da API: 'token' (Token do DRF, com cache) ou 'signed' (access
+# tokens assinados com HMAC + refresh tokens; sem consulta ao banco por requisição)
+AUTH_TOKEN_MODE = config('AUTH_TOKEN_MODE', default='token')
+AUTH_SIGNING_KEY = config('AUTH_SIGNING_KEY', default=SECRET_KEY)
+AUTH_ACCESS_TOKEN_TTL = config('AUTH_ACCESS_TOKEN_TTL', default=300, cast=int)
+AUTH_REFRESH_TOKEN_TTL = config('AUTH_REFRESH_TOKEN_TTL', default=30 * 24 * 60 * 60, cast=int)
+
+API_AUTHENTICATION_CLASSES = [
+    'accounts.authentication.CachedTokenAuthentication',
+    'rest_framework.authentication.SessionAuthentication',
+]
+if AUTH_TOKEN_MODE == 'signed':
+    # Tokens antigos do DRF continuam aceitos até expirarem as sessões dos clientes
+    API_AUTHENTICATION_CLASSES.insert(0, 'accounts.authentication.SignedTokenAuthentication')
+
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
-        'rest_framework.authentication.SessionAuthentication',
-    ],
+    'DEFAULT_AUTHENTICATION_CLASSES': API_AUTHENTICATION_CLASSES,
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # Proxies confiáveis à frente da aplicação (X-Forwarded-For) para os limites por IP
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.SearchFilter',
@@ -133,6 +169,31 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Tempo em segundos que a resolução token→usuário fica no cache
+AUTH_TOKEN_CACHE_TTL = config('AUTH_TOKEN_CACHE_TTL', default=60, cast=int)
+
+# Controle de admissão de signin/signup: PBKDF2 roda em um executor limitado
+# por processo (excesso recebe 429 na hora) e há limites por IP e por email
+AUTH_ADMISSION_CONTROL = config('AUTH_ADMISSION_CONTROL', default=True, cast=bool)
+AUTH_HASH_WORKERS = config('AUTH_HASH_WORKERS', default=2, cast=int)
+AUTH_HASH_QUEUE_DEPTH = config('AUTH_HASH_QUEUE_DEPTH', default=4, cast=int)
+# Espera máxima pelo resultado; só cancela hashes ainda na fila (os já iniciados terminam)
+AUTH_HASH_TIMEOUT = config('AUTH_HASH_TIMEOUT', default=5, cast=float)
+AUTH_THROTTLE_RATES = {
+    'auth_ip': config('AUTH_THROTTLE_IP_RATE', default='30/min'),
+    'auth_email': config('AUTH_THROTTLE_EMAIL_RATE', default='10/min'),
+}
+
+# Feedback bufferizado: o envio vai para uma lista no Redis e o beat grava
+# em lote a cada FEEDBACK_FLUSH_INTERVAL segundos (ver accounts/feedback.py)
+FEEDBACK_BUFFERED = config('FEEDBACK_BUFFERED', default=True, cast=bool)
+FEEDBACK_FLUSH_INTERVAL = config('FEEDBACK_FLUSH_INTERVAL', default=10, cast=int)
+FEEDBACK_FLUSH_BATCH_SIZE = config('FEEDBACK_FLUSH_BATCH_SIZE', default=500, cast=int)
+FEEDBACK_FLUSH_MAX_ATTEMPTS = config('FEEDBACK_FLUSH_MAX_ATTEMPTS', default=3, cast=int)
+
+# Snapshot por usuário de /api/auth/bootstrap (invalidado a cada gravação)
+BOOTSTRAP_CACHE_TTL = config('BOOTSTRAP_CACHE_TTL', default=300, cast=int)
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -144,13 +205,112 @@ CORS_ALLOWED_ORIGINS = [
 CORS_ALLOW_CREDENTIALS = True
 
 # Celery Configuration (Redis)
-CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://localhost:6379/0')
-CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default='redis://localhost:6379/0')
+REDIS_URL = config('REDIS_URL', default='redis://localhost:6379/0')
+# Lista do buffer de feedback: Redis persistente (o do broker), não o de cache
+FEEDBACK_BUFFER_REDIS_URL = config('FEEDBACK_BUFFER_REDIS_URL', default=REDIS_URL)
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default=REDIS_URL)
+CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default=REDIS_URL)
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# Filas: 'emergency' tem workers exclusivos para que o envio de alertas não
+# espere atrás de processamento de anexos, feedback e limpezas ('bulk')
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_QUEUES = (
+    Queue('emergency'),
+    Queue('default'),
+    Queue('bulk'),
+)
+# No Redis, 0 é a maior prioridade
+CELERY_TASK_DEFAULT_PRIORITY = 5
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'priority_steps': list(range(10)),
+    'sep': ':',
+    'queue_order_strategy': 'priority',
+}
+CELERY_TASK_ROUTES = {
+    'emergency.tasks.dispatch_emergency_alert': {'queue': 'emergency', 'priority': 0},
+    'emergency.tasks.deliver_alert_to_contact': {'queue': 'emergency', 'priority': 0},
+    'emergency.tasks.*': {'queue': 'emergency'},
+    'diary.tasks.*': {'queue': 'bulk'},
+    'accounts.tasks.*': {'queue': 'bulk'},
+    'sync.tasks.*': {'queue': 'bulk'},
+    'lia_project.celery.bulk_load_task': {'queue': 'bulk'},
+}
+CELERY_WORKER_PREFETCH_MULTIPLIER = config('CELERY_WORKER_PREFETCH_MULTIPLIER', default=1, cast=int)
+# Tarefas periódicas (serviço celery-beat)
+CELERY_BEAT_SCHEDULE = {
+    'prune-sync-tombstones': {
+        'task': 'sync.tasks.prune_tombstones',
+        'schedule': 24 * 60 * 60,
+    },
+    'prune-refresh-tokens': {
+        'task': 'accounts.tasks.prune_refresh_tokens',
+        'schedule': 24 * 60 * 60,
+    },
+    'prune-account-exports': {
+        'task': 'accounts.tasks.prune_account_exports',
+        'schedule': 60 * 60,
+    },
+    # Entregas vencidas (next_attempt_at) ou presas em 'sending'
+    'requeue-pending-deliveries': {
+        'task': 'emergency.tasks.requeue_pending_deliveries',
+        'schedule': 60,
+    },
+    'flush-feedback': {
+        'task': 'accounts.tasks.flush_feedback',
+        'schedule': FEEDBACK_FLUSH_INTERVAL,
+    },
+}
+
+# Cache: Redis compartilhado com fallback para memória local (ver lia_project/cache.py)
+CACHE_REDIS_URL = config('CACHE_REDIS_URL', default=REDIS_URL)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_REDIS_URL,
+        'OPTIONS': {
+            'socket_connect_timeout': 0.5,
+            'socket_timeout': 0.5,
+        },
+    } if CACHE_REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'lia-default',
+    },
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'lia-local',
+    },
+}
+
+# Emergency alert dispatch
+CONTACT_ROUTING_CACHE_TTL = config('CONTACT_ROUTING_CACHE_TTL', default=24 * 60 * 60, cast=int)
+EMERGENCY_ALERT_TRANSPORT = config('EMERGENCY_ALERT_TRANSPORT', default='emergency.transports.LoggingTransport')
+EMERGENCY_DELIVERY_MAX_RETRIES = config('EMERGENCY_DELIVERY_MAX_RETRIES', default=5, cast=int)
+EMERGENCY_DELIVERY_RETRY_BACKOFF = config('EMERGENCY_DELIVERY_RETRY_BACKOFF', default=2, cast=int)
+EMERGENCY_DELIVERY_STALE_AFTER = config('EMERGENCY_DELIVERY_STALE_AFTER', default=300, cast=int)
+EMERGENCY_DELIVERY_BATCH_SIZE = config('EMERGENCY_DELIVERY_BATCH_SIZE', default=100, cast=int)
+EMERGENCY_LOCATION_BATCH_LIMIT = config('EMERGENCY_LOCATION_BATCH_LIMIT', default=500, cast=int)
+EMERGENCY_LOCATION_PAGE_SIZE = config('EMERGENCY_LOCATION_PAGE_SIZE', default=5000, cast=int)
+OUTBOX_BATCH_SIZE = config('OUTBOX_BATCH_SIZE', default=200, cast=int)
+OUTBOX_POLL_INTERVAL = config('OUTBOX_POLL_INTERVAL', default=0.2, cast=float)
+OUTBOX_EAGER_RELAY = config('OUTBOX_EAGER_RELAY', default=True, cast=bool)
+# Limite (segundos) da publicação imediata feita dentro da requisição
+OUTBOX_EAGER_TIMEOUT = config('OUTBOX_EAGER_TIMEOUT', default=0.5, cast=float)
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=24 * 60 * 60, cast=int)
+
+# Telegram Bot API (limites por processo de worker)
+TELEGRAM_BOT_TOKEN = config('TELEGRAM_BOT_TOKEN', default='')
+TELEGRAM_API_URL = config('TELEGRAM_API_URL', default='https://api.telegram.org')
+TELEGRAM_POOL_SIZE = config('TELEGRAM_POOL_SIZE', default=16, cast=int)
+TELEGRAM_BOT_RATE = config('TELEGRAM_BOT_RATE', default=30, cast=float)
+TELEGRAM_CHAT_RATE = config('TELEGRAM_CHAT_RATE', default=1, cast=float)
+TELEGRAM_CHAT_BURST = config('TELEGRAM_CHAT_BURST', default=3, cast=int)
+TELEGRAM_MAX_WAIT = config('TELEGRAM_MAX_WAIT', default=5, cast=float)
+TELEGRAM_TIMEOUT = config('TELEGRAM_TIMEOUT', default=10, cast=float)
+
 # Logging
 LOGGING = {
     'version': 1,
@@ -10,6 +10,7 @@ urlpatterns = [
     path('api/diary/', include('diary.urls')),
     path('api/contacts/', include('contacts.urls')),
     path('api/emergency/', include('emergency.urls')),
+    path('api/sync/', include('sync.urls')),
 ]
 
 if settings.DEBUG:
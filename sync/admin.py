@@ -0,0 +1,9 @@
+
+from django.contrib import admin
+from .models import SyncTombstone
+
+@admin.register(SyncTombstone)
+class SyncTombstoneAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'object_id', 'user_id', 'deleted_at')
+    list_filter = ('kind', 'deleted_at')
+    search_fields = ('object_id', 'user_id')
@@ -0,0 +1,10 @@
+
+from django.apps import AppConfig
+
+class SyncConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'sync'
+    verbose_name = 'Sincronização'
+    
+    def ready(self):
+        import sync.signals
@@ -0,0 +1,33 @@
+
+from django.db import models
+from django.utils import timezone
+
+class SyncTombstone(models.Model):
+    """
+    Registro de um item apagado, para que clientes offline removam a cópia
+    local no próximo /sync. Sem FK para o usuário: a lápide precisa sobreviver
+    à remoção do item e não pode travar a exclusão da conta
+    """
+
+    KIND_CHOICES = [
+        ('diary_entries', 'Entrada do diário'),
+        ('safe_contacts', 'Contato seguro'),
+        ('emergency_contacts', 'Contato de emergência'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    user_id = models.UUIDField()
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    object_id = models.UUIDField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Item Apagado'
+        verbose_name_plural = 'Itens Apagados'
+        indexes = [
+            models.Index(fields=['user_id', 'deleted_at', 'id'], name='sync_tombstone_user_keyset'),
+            models.Index(fields=['deleted_at'], name='sync_tombstone_deleted_at'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
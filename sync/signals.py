@@ -0,0 +1,25 @@
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from contacts.models import SafeContact, EmergencyContact
+from diary.models import DiaryEntry, DiaryAttachment
+from .models import SyncTombstone
+
+KINDS = {
+    DiaryEntry: 'diary_entries',
+    SafeContact: 'safe_contacts',
+    EmergencyContact: 'emergency_contacts',
+}
+
+@receiver(post_delete, sender=DiaryEntry)
+@receiver(post_delete, sender=SafeContact)
+@receiver(post_delete, sender=EmergencyContact)
+def record_tombstone(sender, instance, **kwargs):
+    SyncTombstone.objects.create(user_id=instance.user_id, kind=KINDS[sender], object_id=instance.pk)
+
+@receiver(post_save, sender=DiaryAttachment)
+@receiver(post_delete, sender=DiaryAttachment)
+def touch_entry(sender, instance, **kwargs):
+    """Anexo novo, processado ou removido muda a entrada vista pelo /sync"""
+    DiaryEntry.objects.filter(pk=instance.entry_id).update(updated_at=timezone.now())
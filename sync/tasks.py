@@ -0,0 +1,13 @@
+
+from datetime import timedelta
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+from .models import SyncTombstone
+
+@shared_task
+def prune_tombstones():
+    """Apagar lápides antigas; clientes com marca d'água anterior refazem a sincronização completa"""
+    cutoff = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_TTL_DAYS)
+    deleted, _ = SyncTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
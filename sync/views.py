@@ -0,0 +1,135 @@
+
+import base64
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from contacts.models import SafeContact, EmergencyContact
+from contacts.serializers import SafeContactSerializer, EmergencyContactSerializer
+from diary.models import DiaryEntry
+from diary.serializers import DiaryEntrySerializer
+from lia_project.pagination import seek
+from .models import SyncTombstone
+import uuid
+
+ORDERING = ('updated_at', 'id')
+TOMBSTONE_ORDERING = ('deleted_at', 'id')
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+def collections(user):
+    """(nome, queryset, serializer) de cada coleção sincronizada"""
+    return [
+        ('diary_entries', DiaryEntry.objects.filter(user=user).prefetch_related('attachment_files'), DiaryEntrySerializer),
+        ('safe_contacts', SafeContact.objects.filter(user=user), SafeContactSerializer),
+        ('emergency_contacts', EmergencyContact.objects.filter(user=user), EmergencyContactSerializer),
+    ]
+
+def encode_watermark(state):
+    # Instantes em microssegundos e UUIDs em hex, para manter a marca d'água curta
+    payload = json.dumps({
+        key: [(moment - EPOCH) // MICROSECOND, key_id if key == 'tombstones' else key_id.hex]
+        for key, (moment, key_id) in state.items()
+    }, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_watermark(encoded):
+    """
+    {coleção: (updated_at, id), 'tombstones': (deleted_at, id)}, já convertido.
+    Levanta ValueError se a marca d'água for inválida
+    """
+    try:
+        state = json.loads(base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+        return {
+            key: (
+                EPOCH + timedelta(microseconds=micros),
+                int(key_id) if key == 'tombstones' else uuid.UUID(hex=key_id)
+            )
+            for key, (micros, key_id) in state.items()
+        }
+    except (TypeError, AttributeError, OverflowError, json.JSONDecodeError, UnicodeDecodeError) as exc:
+        raise ValueError(str(exc))
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sync(request):
+    """
+    Sincronização incremental para clientes offline.
+    
+    Sem ?watermark= devolve tudo; com ela, só o que mudou desde então
+    (ordem (updated_at, id)) e os ids apagados em 'deleted'. Coleções sem
+    mudanças são omitidas, então uma conta sem alterações recebe só a nova
+    marca d'água. Com has_more=true, chame de novo com a marca d'água recebida.
+    reset=true pede que o cliente descarte a cópia local (marca d'água mais
+    antiga que as lápides guardadas)
+    """
+    now = timezone.now()
+    # Linhas muito recentes ficam para a próxima chamada: uma transação que
+    # ainda não confirmou pode ter updated_at anterior ao de linhas já visíveis
+    upper = now - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', settings.SYNC_PAGE_SIZE)), settings.SYNC_PAGE_SIZE))
+    except ValueError:
+        limit = settings.SYNC_PAGE_SIZE
+    
+    state = {}
+    encoded = request.query_params.get('watermark')
+    if encoded:
+        try:
+            state = decode_watermark(encoded)
+        except ValueError:
+            return Response({'error': "Marca d'água inválida"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    oldest_tombstone = now - timedelta(days=settings.SYNC_TOMBSTONE_TTL_DAYS)
+    reset = bool(state) and ('tombstones' not in state or state['tombstones'][0] < oldest_tombstone)
+    if reset:
+        state = {}
+    
+    response = {}
+    has_more = False
+    context = {'request': request}
+    for name, queryset, serializer_class in collections(request.user):
+        queryset = queryset.filter(updated_at__lt=upper).order_by(*ORDERING)
+        if name in state:
+            queryset = queryset.filter(seek(ORDERING, state[name]))
+        rows = list(queryset[:limit + 1])
+        if len(rows) > limit:
+            rows = rows[:limit]
+            has_more = True
+        if rows:
+            response[name] = serializer_class(rows, many=True, context=context).data
+            state[name] = (rows[-1].updated_at, rows[-1].id)
+    
+    if 'tombstones' in state:
+        tombstones = list(
+            SyncTombstone.objects
+            .filter(user_id=request.user.id, deleted_at__lt=upper)
+            .filter(seek(TOMBSTONE_ORDERING, state['tombstones']))
+            .order_by(*TOMBSTONE_ORDERING)
+            .values_list('deleted_at', 'id', 'kind', 'object_id')[:limit + 1]
+        )
+        if len(tombstones) > limit:
+            tombstones = tombstones[:limit]
+            has_more = True
+            state['tombstones'] = tombstones[-1][:2]
+        else:
+            # Tudo até upper já foi entregue
+            state['tombstones'] = max(state['tombstones'], (upper, 0))
+        deleted = {}
+        for _, _, kind, object_id in tombstones:
+            deleted.setdefault(kind, []).append(object_id)
+        if deleted:
+            response['deleted'] = deleted
+    else:
+        # Sincronização completa: lápides anteriores não interessam ao cliente
+        state['tombstones'] = (upper, 0)
+    
+    response['watermark'] = encode_watermark(state)
+    response['has_more'] = has_more
+    if reset:
+        response['reset'] = True
+    return Response(response)